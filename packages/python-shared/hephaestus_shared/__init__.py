@@ -0,0 +1,3 @@
+from .matcher import KeywordMatcher, read_patterns
+
+__all__ = ["KeywordMatcher", "read_patterns"]
@@ -0,0 +1,78 @@
+import collections
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over labelled keyword groups.
+
+    One pass over the text finds every keyword it contains as a substring, however many patterns are loaded.
+    """
+
+    def __init__(self, groups: Dict[Any, Iterable[str]]):
+        self.groups = {label: list(dict.fromkeys(p.lower() for p in patterns if p)) for label, patterns in groups.items()}
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[Tuple[Any, int], ...]] = [()]
+        for label, patterns in self.groups.items():
+            for index, pattern in enumerate(patterns):
+                node = 0
+                for ch in pattern:
+                    if ch not in self.goto[node]:
+                        self.goto[node][ch] = len(self.goto)
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.out.append(())
+                    node = self.goto[node][ch]
+                self.out[node] += ((label, index),)
+        frontier = collections.deque(self.goto[0].values())
+        while frontier:
+            node = frontier.popleft()
+            for ch, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.out[child] += self.out[self.fail[child]]
+                frontier.append(child)
+
+    @property
+    def pattern_count(self) -> int:
+        return sum(len(patterns) for patterns in self.groups.values())
+
+    def scan(self, text: str) -> Dict[Any, Tuple[str, ...]]:
+        """Matched patterns per label, in the order they were configured. Callers must not mutate the result."""
+        goto, fail, out = self.goto, self.fail, self.out
+        hits: Dict[Any, set] = {}
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for label, index in out[node]:
+                hits.setdefault(label, set()).add(index)
+        return {label: tuple(self.groups[label][i] for i in sorted(found)) for label, found in hits.items()}
+
+
+def read_patterns(path: str) -> Dict[str, Any]:
+    """Read `{"intents": {name: [keywords]}, "forbidden": [patterns]}`.
+
+    Both keys are optional and only the ones present are returned, so callers fall back to their built-in lists.
+    Raises OSError for an unreadable file and ValueError for malformed content.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    if not isinstance(data, dict):
+        raise ValueError("patterns file must contain a JSON object")
+    patterns: Dict[str, Any] = {}
+    if "intents" in data:
+        intents = data["intents"]
+        if not isinstance(intents, dict) or not all(isinstance(words, list) for words in intents.values()):
+            raise ValueError("intents must map intent names to keyword lists")
+        patterns["intents"] = {str(name): [str(word) for word in words] for name, words in intents.items()}
+    if "forbidden" in data:
+        forbidden = data["forbidden"]
+        if not isinstance(forbidden, list):
+            raise ValueError("forbidden must be a list of patterns")
+        patterns["forbidden"] = [str(p) for p in forbidden]
+    return patterns
@@ -5,12 +5,18 @@ from uuid import uuid4
 import base64
 import hashlib
 import json
+import logging
 import mimetypes
 import os
 import subprocess
+import threading
+import time
 import requests
 
+from hephaestus_shared import KeywordMatcher, read_patterns
+
 app = FastAPI(title="Hephaestus AI Service")
+LOGGER = logging.getLogger("hephaestus.ai")
 
 JOBS = {}
 KNOWN_PROVIDERS = ["openai", "ollama"]
@@ -33,6 +39,9 @@ INTENT_PREFERENCE = {
     "file_analysis_document": ["openai", "ollama"]
 }
 
+INTENT_PATTERNS_PATH = os.getenv("AI_INTENT_PATTERNS_PATH", "")
+INTENT_PATTERNS_RELOAD_SECONDS = float(os.getenv("AI_INTENT_PATTERNS_RELOAD_SECONDS", "5"))
+
 OPENAI_RESPONSES_URL = "https://api.openai.com/v1/responses"
 OPENAI_TRANSCRIPTIONS_URL = "https://api.openai.com/v1/audio/transcriptions"
 
@@ -92,12 +101,35 @@ def hash_file(path: str) -> Optional[str]:
         return None
 
 
-def _score_intent(message: str, words: List[str]) -> int:
-    score = 0
-    for word in words:
-        if word in message:
-            score += 1
-    return score
+_MATCHER_LOCK = threading.Lock()
+_MATCHER_STATE: Dict[str, Any] = {"matcher": KeywordMatcher(INTENTS), "mtime": None, "checked_at": 0.0}
+
+
+def _intent_matcher() -> KeywordMatcher:
+    """Matcher for INTENTS, or for the `intents` of AI_INTENT_PATTERNS_PATH when set; the file is re-read when it changes."""
+    if not INTENT_PATTERNS_PATH or time.monotonic() - _MATCHER_STATE["checked_at"] < INTENT_PATTERNS_RELOAD_SECONDS:
+        return _MATCHER_STATE["matcher"]
+    with _MATCHER_LOCK:
+        _MATCHER_STATE["checked_at"] = time.monotonic()
+        try:
+            mtime = os.stat(INTENT_PATTERNS_PATH).st_mtime_ns
+        except OSError:
+            mtime = -1
+        if mtime != _MATCHER_STATE["mtime"]:
+            # Recorded first so a bad file is logged once per change; the previous matcher stays in use.
+            _MATCHER_STATE["mtime"] = mtime
+            try:
+                intents = read_patterns(INTENT_PATTERNS_PATH).get("intents", INTENTS)
+                _MATCHER_STATE["matcher"] = KeywordMatcher(intents)
+            except (OSError, ValueError):
+                LOGGER.exception("failed to load intent patterns from %s", INTENT_PATTERNS_PATH)
+    return _MATCHER_STATE["matcher"]
+
+
+def _score_intents(message: str) -> Dict[str, int]:
+    matcher = _intent_matcher()
+    hits = matcher.scan(message)
+    return {intent: len(hits.get(intent, ())) for intent in matcher.groups}
 
 
 def _route_chat_intent(message: str, file_id: Optional[str]):
@@ -107,8 +139,7 @@ def _route_chat_intent(message: str, file_id: Optional[str]):
     text = (message or "").lower()
     best_intent = "chat"
     best_score = 0
-    for intent, words in INTENTS.items():
-        current = _score_intent(text, words)
+    for intent, current in _score_intents(text).items():
         if current > best_score:
             best_score = current
             best_intent = intent
@@ -1,10 +1,37 @@
 import { errorJson } from "../http.js";
 
+async function forwardGraphStream(upstreamResponse, res) {
+  res.setHeader("Content-Type", "text/event-stream; charset=utf-8");
+  res.setHeader("Cache-Control", "no-cache");
+  res.setHeader("Connection", "keep-alive");
+  res.flushHeaders();
+
+  const reader = upstreamResponse.body.getReader();
+  res.on("close", () => {
+    if (!res.writableFinished) reader.cancel().catch(() => {});
+  });
+
+  try {
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      res.write(Buffer.from(value));
+    }
+  } catch (error) {
+    if (!res.writableEnded) {
+      const event = { type: "error", code: "orchestrator_stream_error", message: error?.message || "" };
+      res.write(`event: error\ndata: ${JSON.stringify(event)}\n\n`);
+    }
+  }
+  res.end();
+}
+
 export function registerOrchestratorRoutes(app, config) {
   app.post("/orchestrator/run", async (req, res) => {
     const body = req.body || {};
     const prompt = typeof body.prompt === "string" ? body.prompt.trim() : "";
     const sessionId = typeof body.sessionId === "string" ? body.sessionId.trim() : "";
+    const stream = body.stream === true;
 
     if (!prompt) {
       res.status(400).json(errorJson("invalid_request", "prompt is required."));
@@ -12,7 +39,8 @@ export function registerOrchestratorRoutes(app, config) {
     }
 
     try {
-      const response = await fetch(`${config.orchestratorUrl.replace(/\/$/, "")}/v1/graph/run`, {
+      const endpoint = stream ? "/v1/graph/stream?format=sse" : "/v1/graph/run";
+      const response = await fetch(`${config.orchestratorUrl.replace(/\/$/, "")}${endpoint}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -24,10 +52,24 @@ export function registerOrchestratorRoutes(app, config) {
 
       if (!response.ok) {
         const text = await response.text();
+        if (response.status === 429 || response.status === 503) {
+          // Orchestrator load shedding: keep the status and Retry-After so callers back off instead of retrying.
+          const retryAfter = response.headers.get("retry-after");
+          if (retryAfter) res.setHeader("Retry-After", retryAfter);
+          res
+            .status(response.status)
+            .json(errorJson("orchestrator_overloaded", "Orchestrator is overloaded. Retry later.", { upstream: text }));
+          return;
+        }
         res.status(502).json(errorJson("orchestrator_error", "Orchestrator call failed.", { upstream: text }));
         return;
       }
 
+      if (stream) {
+        await forwardGraphStream(response, res);
+        return;
+      }
+
       const payload = await response.json();
       res.json({ ok: true, result: payload });
     } catch (error) {
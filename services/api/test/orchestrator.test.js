@@ -64,3 +64,73 @@ test("orchestrator route proxies successful run", async () => {
     upstream.close();
   }
 });
+
+test("orchestrator route forwards graph progress stream", async () => {
+  const upstream = http.createServer((req, res) => {
+    if (req.method === "POST" && req.url === "/v1/graph/stream?format=sse") {
+      res.writeHead(200, { "Content-Type": "text/event-stream" });
+      res.write(`event: step\ndata: ${JSON.stringify({ type: "step", node: "intent_router", step_hash: "abc" })}\n\n`);
+      res.end(`event: final\ndata: ${JSON.stringify({ type: "final", final_answer: "done" })}\n\n`);
+      return;
+    }
+    res.writeHead(404).end();
+  });
+  upstream.listen(0);
+  await once(upstream, "listening");
+  const upstreamPort = upstream.address().port;
+
+  const app = createApp(baseConfig(`http://127.0.0.1:${upstreamPort}`));
+  const server = app.listen(0);
+  await once(server, "listening");
+  const port = server.address().port;
+
+  try {
+    const resp = await fetch(`http://127.0.0.1:${port}/orchestrator/run`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ prompt: "test prompt", stream: true })
+    });
+    assert.equal(resp.status, 200);
+    assert.match(resp.headers.get("content-type"), /text\/event-stream/);
+    const events = (await resp.text())
+      .split("\n")
+      .filter((line) => line.startsWith("data:"))
+      .map((line) => JSON.parse(line.slice(5)));
+    assert.deepEqual(events.map((event) => event.type), ["step", "final"]);
+    assert.equal(events[1].final_answer, "done");
+  } finally {
+    server.close();
+    upstream.close();
+  }
+});
+
+test("orchestrator route passes load shedding through with Retry-After", async () => {
+  const upstream = http.createServer((req, res) => {
+    const status = req.url === "/v1/graph/run" ? 429 : 404;
+    res.writeHead(status, { "Content-Type": "application/json", "Retry-After": "3" });
+    res.end(JSON.stringify({ ok: false, error: "overloaded", reason: "queue_full" }));
+  });
+  upstream.listen(0);
+  await once(upstream, "listening");
+  const upstreamPort = upstream.address().port;
+
+  const app = createApp(baseConfig(`http://127.0.0.1:${upstreamPort}`));
+  const server = app.listen(0);
+  await once(server, "listening");
+  const port = server.address().port;
+
+  try {
+    const resp = await fetch(`http://127.0.0.1:${port}/orchestrator/run`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ prompt: "test prompt" })
+    });
+    assert.equal(resp.status, 429);
+    assert.equal(resp.headers.get("retry-after"), "3");
+    const payload = await resp.json();
+    assert.equal(payload.error.code, "orchestrator_overloaded");
+  } finally {
+    server.close();
+    upstream.close();
+  }
+});
@@ -1,39 +1,78 @@
 from __future__ import annotations
 
 import ast
+import asyncio
+import codecs
+import collections
 import contextlib
+import contextvars
+import dataclasses
 import datetime as dt
+import fcntl
+import functools
 import hashlib
+import heapq
 import json
+import logging
 import math
+import mmap
+import multiprocessing
 import os
+import pickle
+import queue
+import random
 import re
+import struct
+import tempfile
+import threading
 import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Annotated, Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypedDict, Union
 from urllib.parse import urlparse
 from uuid import uuid4
 
+import httpx
+import numpy as np
 import psycopg
 import requests
-from fastapi import FastAPI
+from requests.adapters import HTTPAdapter
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import END, START, StateGraph
+from langgraph.types import Command
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from prometheus_client import Counter, Histogram, generate_latest
-from fastapi.responses import PlainTextResponse
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout
 from pydantic import BaseModel, Field
 
+from embedding import EMBEDDING_DIM, embed_batch_timed, embed_texts, token_feature, tokenize
+from hephaestus_shared import KeywordMatcher, read_patterns
+
 app = FastAPI(title="Hephaestus Orchestrator", version="0.2.0")
+LOGGER = logging.getLogger("hephaestus.orchestrator")
 
 
 class GraphRunRequest(BaseModel):
     prompt: str = Field(min_length=1)
     session_id: Optional[str] = None
     metadata: Dict[str, Any] = {}
+    # False forces a fresh execution: no result cache and no coalescing onto an identical in-flight run.
+    cache: bool = True
+
+
+class GraphBatchRequest(BaseModel):
+    runs: List[GraphRunRequest] = Field(min_length=1, max_length=1000)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=256)
 
 
 class KnowledgeIngestRequest(BaseModel):
@@ -47,6 +86,11 @@ class KnowledgeIngestRequest(BaseModel):
 class KnowledgeSearchRequest(BaseModel):
     query: str = Field(min_length=1)
     top_k: int = Field(default=5, ge=1, le=20)
+    probes: Optional[int] = Field(default=None, ge=1, le=1000)
+
+
+def merge_branches(current: Dict[str, Dict[str, Any]], update: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {**current, **update}
 
 
 class OrchestratorState(TypedDict):
@@ -64,6 +108,23 @@ class OrchestratorState(TypedDict):
     steps: List[Dict[str, Any]]
     step_hash: str
     metadata: Dict[str, Any]
+    branches: Annotated[Dict[str, Dict[str, Any]], merge_branches]
+    child_runs: List[Dict[str, Any]]
+    # Wall-clock epoch seconds so the deadline survives checkpoints and resumes; 0 means no deadline.
+    deadline_at: float
+
+
+def usable_cpu_count() -> int:
+    """CPUs this process may run on: its affinity mask, further limited by a cgroup v2 CPU quota."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r", encoding="ascii") as handle:
+            quota, period = handle.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
 
 
 FORBIDDEN_PATTERNS = [
@@ -73,13 +134,86 @@ FORBIDDEN_PATTERNS = [
     "malware",
     "exploit zero-day",
 ]
+# Checked in order; the first intent with any keyword in the prompt wins.
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "multimodal_rag": ["file", "image", "audio", "video"],
+    "planning": ["plan", "roadmap", "milestone"],
+    "research": ["compare", "verify", "fact check"],
+}
+MATCHER_PATTERNS_PATH = os.getenv("ORCH_MATCHER_PATTERNS_PATH", "")
+MATCHER_RELOAD_SECONDS = float(os.getenv("ORCH_MATCHER_RELOAD_SECONDS", "5"))
 MAX_SUBAGENT_DEPTH = int(os.getenv("ORCH_MAX_SUBAGENT_DEPTH", "2"))
 MAX_SUBAGENT_CHILDREN = int(os.getenv("ORCH_MAX_SUBAGENT_CHILDREN", "4"))
 MAX_EXECUTION_ATTEMPTS = int(os.getenv("ORCH_TOOL_MAX_RETRIES", "2"))
 CIRCUIT_FAIL_THRESHOLD = int(os.getenv("ORCH_CIRCUIT_FAIL_THRESHOLD", "3"))
 CIRCUIT_RESET_SECONDS = int(os.getenv("ORCH_CIRCUIT_RESET_SECONDS", "60"))
-EMBEDDING_DIM = 384
-MEMORY_KNOWLEDGE: List[Dict[str, Any]] = []
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("ORCH_CIRCUIT_HALF_OPEN_PROBES", "1"))
+CIRCUIT_BACKEND = os.getenv("ORCH_CIRCUIT_BACKEND", "local").strip().lower()
+CIRCUIT_CACHE_SECONDS = float(os.getenv("ORCH_CIRCUIT_CACHE_SECONDS", "1"))
+CIRCUIT_SHM_PATH = os.getenv(
+    "ORCH_CIRCUIT_SHM_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "hephaestus-orchestrator-circuits"),
+)
+TOOL_RETRY_BASE_SECONDS = float(os.getenv("ORCH_TOOL_RETRY_BASE_SECONDS", "0.2"))
+TOOL_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("ORCH_TOOL_RETRY_MAX_BACKOFF_SECONDS", "2"))
+DB_POOL_MIN_SIZE = int(os.getenv("ORCH_DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("ORCH_DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("ORCH_DB_POOL_TIMEOUT_SECONDS", "5"))
+DB_POOL_MAX_WAITING = int(os.getenv("ORCH_DB_POOL_MAX_WAITING", "0"))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("ORCH_DB_POOL_MAX_IDLE_SECONDS", "300"))
+PERSIST_MODE = os.getenv("ORCH_PERSIST_MODE", "sync").strip().lower()
+PERSIST_QUEUE_SIZE = int(os.getenv("ORCH_PERSIST_QUEUE_SIZE", "1000"))
+PERSIST_BATCH_SIZE = int(os.getenv("ORCH_PERSIST_BATCH_SIZE", "100"))
+PERSIST_FLUSH_INTERVAL_SECONDS = float(os.getenv("ORCH_PERSIST_FLUSH_INTERVAL_SECONDS", "0.25"))
+EMBED_BATCH_SIZE = int(os.getenv("ORCH_EMBED_BATCH_SIZE", "256"))
+# Capped: each worker costs a process and its memory, and only pays off with idle cores to spare.
+EMBED_PROCESSES = int(os.getenv("ORCH_EMBED_PROCESSES", str(min(usable_cpu_count(), 4))))
+EMBED_PROCESS_MIN_CHUNKS = int(os.getenv("ORCH_EMBED_PROCESS_MIN_CHUNKS", "2048"))
+BULK_INGEST_MAX_LINE_BYTES = int(os.getenv("ORCH_BULK_INGEST_MAX_LINE_BYTES", str(64 * 1024 * 1024)))
+INGEST_TEXT_PIECE_CHARS = 64 * 1024
+INGEST_PIPELINE_DEPTH = int(os.getenv("ORCH_INGEST_PIPELINE_DEPTH", "2"))
+INGEST_STREAM_QUEUE_PIECES = int(os.getenv("ORCH_INGEST_STREAM_QUEUE_PIECES", "8"))
+MEMORY_INITIAL_CAPACITY = int(os.getenv("ORCH_MEMORY_INITIAL_CAPACITY", "1024"))
+IVFFLAT_LISTS = int(os.getenv("ORCH_IVFFLAT_LISTS", "100"))
+IVFFLAT_PROBES = int(os.getenv("ORCH_IVFFLAT_PROBES", "0"))
+RRF_K = 60.0
+SEARCH_CACHE_SIZE = int(os.getenv("ORCH_SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("ORCH_SEARCH_CACHE_TTL_SECONDS", "300"))
+SEARCH_CACHE_REDIS_URL = os.getenv("ORCH_SEARCH_CACHE_REDIS_URL", "").strip()
+BM25_K1 = float(os.getenv("ORCH_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("ORCH_BM25_B", "0.75"))
+TOOL_WORKERS = int(os.getenv("ORCH_TOOL_WORKERS", "16"))
+# Parallel branches fanned out after the planner; the join node folds them into the step chain in this order.
+BRANCH_ORDER = ("researcher", "executor", "sub_agents")
+SUBAGENT_WORKERS = int(os.getenv("ORCH_SUBAGENT_WORKERS", "8"))
+SUBAGENT_MAX_CONCURRENCY = int(os.getenv("ORCH_SUBAGENT_MAX_CONCURRENCY", "2"))
+TRIVIAL_PROMPT_MAX_TOKENS = int(os.getenv("ORCH_TRIVIAL_PROMPT_MAX_TOKENS", "4"))
+RESULT_CACHE_SIZE = int(os.getenv("ORCH_RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("ORCH_RESULT_CACHE_TTL_SECONDS", "0"))
+CHECKPOINT_TTL_SECONDS = float(os.getenv("ORCH_CHECKPOINT_TTL_SECONDS", "3600"))
+CHECKPOINT_POOL_MAX_SIZE = int(os.getenv("ORCH_CHECKPOINT_POOL_MAX_SIZE", "4"))
+GRAPH_BATCH_CONCURRENCY = int(os.getenv("ORCH_GRAPH_BATCH_CONCURRENCY", str(usable_cpu_count())))
+ADMISSION_LIMITS = {
+    endpoint_class: (
+        int(os.getenv(f"ORCH_ADMISSION_{endpoint_class.upper()}_CONCURRENCY", concurrency)),
+        int(os.getenv(f"ORCH_ADMISSION_{endpoint_class.upper()}_QUEUE", queue_size)),
+    )
+    for endpoint_class, concurrency, queue_size in (("graph", "16", "32"), ("ingest", "4", "8"), ("search", "32", "64"))
+}
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ORCH_ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ORCH_ADMISSION_RETRY_AFTER_SECONDS", "1"))
+RUN_DEADLINE_SECONDS = float(os.getenv("ORCH_RUN_DEADLINE_SECONDS", "30"))
+RUN_DEADLINE_MAX_SECONDS = float(os.getenv("ORCH_RUN_DEADLINE_MAX_SECONDS", "300"))
+GRAPH_EXECUTION_MODE = os.getenv("ORCH_GRAPH_EXECUTION_MODE", "sync").strip().lower()
+HTTP_MAX_CONNECTIONS = int(os.getenv("ORCH_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ORCH_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("ORCH_HTTP_TIMEOUT_SECONDS", "8"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("ORCH_HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP_MAX_TRACKED_HOSTS = int(os.getenv("ORCH_HTTP_MAX_TRACKED_HOSTS", "1024"))
+HTTP_FETCH_MAX_BYTES = int(os.getenv("ORCH_HTTP_FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+HTTP_FETCH_CHUNK_BYTES = 64 * 1024
+TOOL_CACHE_SIZE = int(os.getenv("ORCH_TOOL_CACHE_SIZE", "2048"))
+HTTP_FETCH_CACHE_TTL_SECONDS = float(os.getenv("ORCH_HTTP_FETCH_CACHE_TTL_SECONDS", "60"))
 TRACE_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "hephaestus-orchestrator")
 
 
@@ -103,8 +237,8 @@ NODE_DURATION_SECONDS = Histogram(
 )
 TOOL_EXECUTIONS_TOTAL = Counter(
     "hephaestus_orchestrator_tool_executions_total",
-    "Total tool execution attempts by tool and status",
-    ["tool", "status"],
+    "Total tool execution attempts by tool, status and cache outcome (hit, miss, revalidated, bypass)",
+    ["tool", "status", "cache"],
 )
 TOOL_CIRCUIT_OPEN_TOTAL = Counter(
     "hephaestus_orchestrator_tool_circuit_open_total",
@@ -116,6 +250,100 @@ GRAPH_RUNS_TOTAL = Counter(
     "Total graph runs by result",
     ["result"],
 )
+DEADLINE_MISSES_TOTAL = Counter(
+    "hephaestus_orchestrator_deadline_misses_total",
+    "Work skipped or cut short because the run deadline passed, by stage",
+    ["stage"],
+)
+MATCHER_RELOADS_TOTAL = Counter(
+    "hephaestus_orchestrator_matcher_reloads_total",
+    "Keyword matcher reloads from the patterns file",
+    ["result"],
+)
+GRAPH_RESUMES_TOTAL = Counter(
+    "hephaestus_orchestrator_graph_resumes_total",
+    "Graph runs resumed from a checkpoint by result",
+    ["result"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "hephaestus_orchestrator_admission_in_flight",
+    "Requests currently admitted by endpoint class",
+    ["endpoint_class"],
+)
+ADMISSION_QUEUED = Gauge(
+    "hephaestus_orchestrator_admission_queued",
+    "Requests waiting for admission by endpoint class",
+    ["endpoint_class"],
+)
+ADMISSION_QUEUE_WAIT_SECONDS = Histogram(
+    "hephaestus_orchestrator_admission_queue_wait_seconds",
+    "Time requests spent waiting for admission by endpoint class",
+    ["endpoint_class"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+ADMISSION_REJECTED_TOTAL = Counter(
+    "hephaestus_orchestrator_admission_rejected_total",
+    "Requests shed by endpoint class and reason (queue_full, queue_timeout)",
+    ["endpoint_class", "reason"],
+)
+DB_POOL_IN_USE = Gauge(
+    "hephaestus_orchestrator_db_pool_in_use",
+    "Postgres connections currently checked out of the pool",
+)
+DB_POOL_WAITING = Gauge(
+    "hephaestus_orchestrator_db_pool_waiting",
+    "Requests waiting for a Postgres connection from the pool",
+)
+DB_POOL_SIZE = Gauge(
+    "hephaestus_orchestrator_db_pool_size",
+    "Postgres connections currently opened by the pool",
+)
+PERSIST_QUEUE_DEPTH = Gauge(
+    "hephaestus_orchestrator_persist_queue_depth",
+    "Graph runs waiting in the write-behind persistence queue",
+)
+EMBED_BATCH_SECONDS = Histogram(
+    "hephaestus_orchestrator_embed_batch_seconds",
+    "Time spent embedding one ingest batch, in the request process (inline) or a pool worker (process)",
+    ["mode"],
+)
+EMBED_POOL_WORKERS = Gauge(
+    "hephaestus_orchestrator_embed_pool_workers",
+    "Worker processes in the embedding pool (0 until a large ingest starts it)",
+)
+EMBED_POOL_IN_FLIGHT = Gauge(
+    "hephaestus_orchestrator_embed_pool_in_flight",
+    "Embedding batches submitted to the process pool and not yet finished",
+)
+PERSIST_FLUSH_SECONDS = Histogram(
+    "hephaestus_orchestrator_persist_flush_seconds",
+    "Time spent writing one batch of graph runs to Postgres",
+)
+GRAPH_ROUTES_TOTAL = Counter(
+    "hephaestus_orchestrator_graph_routes_total",
+    "Graph runs by route taken (blocked, trivial, full)",
+    ["route"],
+)
+SUBAGENT_RUNS_TOTAL = Counter(
+    "hephaestus_orchestrator_subagent_runs_total",
+    "Sub-agent child graph runs by result",
+    ["result"],
+)
+CACHE_EVENTS_TOTAL = Counter(
+    "hephaestus_orchestrator_cache_events_total",
+    "Cache lookups and maintenance events by cache and event (hit, miss, eviction, expired)",
+    ["cache", "event"],
+)
+GRAPH_DEDUPE_TOTAL = Counter(
+    "hephaestus_orchestrator_graph_dedupe_total",
+    "Graph run requests by dedupe outcome (executed, coalesced, cached, bypass)",
+    ["outcome"],
+)
+PERSIST_RUNS_TOTAL = Counter(
+    "hephaestus_orchestrator_persist_runs_total",
+    "Graph runs handed to persistence by mode and result",
+    ["mode", "result"],
+)
 
 
 def now_iso() -> str:
@@ -140,9 +368,48 @@ def append_step(state: OrchestratorState, node: str, payload: Dict[str, Any]) ->
     state["step_hash"] = step_hash
 
 
+RUN_DEADLINE: "contextvars.ContextVar[float]" = contextvars.ContextVar("run_deadline", default=0.0)
+
+
+def run_deadline_at(metadata: Dict[str, Any]) -> float:
+    """Deadline for a new run: `deadline_ms` from metadata, else the server default, capped by the max."""
+    budget = RUN_DEADLINE_SECONDS
+    requested = metadata.get("deadline_ms")
+    if requested is not None:
+        try:
+            budget = float(requested) / 1000.0
+        except (TypeError, ValueError):
+            LOGGER.warning("ignoring invalid deadline_ms: %r", requested)
+    if RUN_DEADLINE_MAX_SECONDS > 0:
+        budget = min(budget, RUN_DEADLINE_MAX_SECONDS) if budget > 0 else RUN_DEADLINE_MAX_SECONDS
+    return time.time() + budget if budget > 0 else 0.0
+
+
+def remaining_budget(deadline_at: Optional[float] = None) -> Optional[float]:
+    deadline_at = RUN_DEADLINE.get() if deadline_at is None else deadline_at
+    if not deadline_at:
+        return None
+    return deadline_at - time.time()
+
+
+def deadline_passed(deadline_at: Optional[float] = None) -> bool:
+    remaining = remaining_budget(deadline_at)
+    return remaining is not None and remaining <= 0
+
+
+def budgeted_timeout(default: float) -> float:
+    """Shrink a tool timeout to what is left of the current run's budget."""
+    remaining = remaining_budget()
+    if remaining is None:
+        return default
+    return max(0.001, min(default, remaining))
+
+
 @contextlib.contextmanager
 def trace_node(name: str, state: OrchestratorState):
     start = time.perf_counter()
+    # Tools called from the node (and the worker threads they fan out to) read the budget from here.
+    deadline_token = RUN_DEADLINE.set(state.get("deadline_at", 0.0))
     with TRACER.start_as_current_span(f"graph.node.{name}") as span:
         span.set_attribute("run.id", state["run_id"])
         span.set_attribute("session.id", state["session_id"])
@@ -153,21 +420,155 @@ def trace_node(name: str, state: OrchestratorState):
         try:
             yield span
         finally:
+            RUN_DEADLINE.reset(deadline_token)
             NODE_DURATION_SECONDS.labels(node=name).observe(time.perf_counter() - start)
 
 
-def get_conn():
+DB_POOL: Optional[ConnectionPool] = None
+DB_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    global DB_POOL
+    dsn = os.getenv("DATABASE_URL", "")
+    if not dsn:
+        return None
+    if DB_POOL is None:
+        with DB_POOL_LOCK:
+            if DB_POOL is None:
+                DB_POOL = ConnectionPool(
+                    dsn,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=max(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+                    timeout=DB_POOL_TIMEOUT_SECONDS,
+                    max_waiting=DB_POOL_MAX_WAITING,
+                    max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                    check=ConnectionPool.check_connection,
+                    name="orchestrator",
+                    open=True,
+                )
+    return DB_POOL
+
+
+def close_pool() -> None:
+    global DB_POOL, CHECKPOINT_POOL
+    with DB_POOL_LOCK:
+        CHECKPOINTED_GRAPHS.pop(False, None)
+        for pool in (DB_POOL, CHECKPOINT_POOL):
+            if pool is not None:
+                pool.close()
+        DB_POOL = CHECKPOINT_POOL = None
+
+
+ASYNC_DB_POOL: Optional[AsyncConnectionPool] = None
+ASYNC_DB_POOL_LOCK = asyncio.Lock()
+
+
+async def aget_pool() -> Optional[AsyncConnectionPool]:
+    global ASYNC_DB_POOL
     dsn = os.getenv("DATABASE_URL", "")
     if not dsn:
         return None
-    return psycopg.connect(dsn)
+    if ASYNC_DB_POOL is None:
+        async with ASYNC_DB_POOL_LOCK:
+            if ASYNC_DB_POOL is None:
+                pool = AsyncConnectionPool(
+                    dsn,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=max(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+                    timeout=DB_POOL_TIMEOUT_SECONDS,
+                    max_waiting=DB_POOL_MAX_WAITING,
+                    max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                    check=AsyncConnectionPool.check_connection,
+                    name="orchestrator-async",
+                    open=False,
+                )
+                await pool.open()
+                ASYNC_DB_POOL = pool
+    return ASYNC_DB_POOL
+
+
+async def aclose_pool() -> None:
+    global ASYNC_DB_POOL, ASYNC_CHECKPOINT_POOL
+    CHECKPOINTED_GRAPHS.pop(True, None)
+    pools = (ASYNC_DB_POOL, ASYNC_CHECKPOINT_POOL)
+    ASYNC_DB_POOL = ASYNC_CHECKPOINT_POOL = None
+    for pool in pools:
+        if pool is not None:
+            await pool.close()
+
+
+# The langgraph Postgres savers expect autocommit connections with dict rows, and prepare_threshold=0 keeps
+# them working behind transaction-pooling proxies. They get their own small pool so checkpoint writes never
+# queue behind request traffic, or the other way round.
+CHECKPOINT_CONNECTION_KWARGS: Dict[str, Any] = {"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}
+CHECKPOINT_POOL: Optional[ConnectionPool] = None
+ASYNC_CHECKPOINT_POOL: Optional[AsyncConnectionPool] = None
+
+
+def get_checkpoint_pool(dsn: str) -> ConnectionPool:
+    global CHECKPOINT_POOL
+    with DB_POOL_LOCK:
+        if CHECKPOINT_POOL is None:
+            CHECKPOINT_POOL = ConnectionPool(
+                dsn,
+                min_size=1,
+                max_size=max(1, CHECKPOINT_POOL_MAX_SIZE),
+                kwargs=CHECKPOINT_CONNECTION_KWARGS,
+                timeout=DB_POOL_TIMEOUT_SECONDS,
+                max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                check=ConnectionPool.check_connection,
+                name="orchestrator-checkpoints",
+                open=True,
+            )
+        return CHECKPOINT_POOL
+
+
+async def aget_checkpoint_pool(dsn: str) -> AsyncConnectionPool:
+    global ASYNC_CHECKPOINT_POOL
+    async with ASYNC_DB_POOL_LOCK:
+        if ASYNC_CHECKPOINT_POOL is None:
+            pool = AsyncConnectionPool(
+                dsn,
+                min_size=1,
+                max_size=max(1, CHECKPOINT_POOL_MAX_SIZE),
+                kwargs=CHECKPOINT_CONNECTION_KWARGS,
+                timeout=DB_POOL_TIMEOUT_SECONDS,
+                max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                check=AsyncConnectionPool.check_connection,
+                name="orchestrator-checkpoints-async",
+                open=False,
+            )
+            await pool.open()
+            ASYNC_CHECKPOINT_POOL = pool
+        return ASYNC_CHECKPOINT_POOL
+
+
+def pool_stats() -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for pool in (DB_POOL, ASYNC_DB_POOL):
+        if pool is None:
+            continue
+        for key, value in pool.get_stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def pool_in_use() -> int:
+    stats = pool_stats()
+    return stats.get("pool_size", 0) - stats.get("pool_available", 0)
+
+
+DB_POOL_IN_USE.set_function(pool_in_use)
+DB_POOL_WAITING.set_function(lambda: pool_stats().get("requests_waiting", 0))
+DB_POOL_SIZE.set_function(lambda: pool_stats().get("pool_size", 0))
 
 
 def init_db():
-    conn = get_conn()
-    if conn is None:
+    pool = get_pool()
+    if pool is None:
         return
-    with conn:
+    with pool.connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -183,6 +584,8 @@ def init_db():
                 );
                 """
             )
+            cur.execute("ALTER TABLE graph_runs ADD COLUMN IF NOT EXISTS parent_run_id TEXT;")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_graph_runs_parent ON graph_runs (parent_run_id);")
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS graph_steps (
@@ -195,6 +598,18 @@ def init_db():
                 );
                 """
             )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tool_circuits (
+                  tool TEXT PRIMARY KEY,
+                  state TEXT NOT NULL DEFAULT 'closed',
+                  fail_count INTEGER NOT NULL DEFAULT 0,
+                  opened_at DOUBLE PRECISION NOT NULL DEFAULT 0,
+                  probes INTEGER NOT NULL DEFAULT 0,
+                  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+                """
+            )
             try:
                 cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
             except Exception:
@@ -214,213 +629,1221 @@ def init_db():
             )
             try:
                 cur.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_knowledge_chunks_embedding ON knowledge_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);"
+                    "CREATE INDEX IF NOT EXISTS idx_knowledge_chunks_embedding ON knowledge_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = %s);"
+                    % max(1, IVFFLAT_LISTS)
                 )
             except Exception:
                 pass
             cur.execute(
-                "CREATE INDEX IF NOT EXISTS idx_knowledge_chunks_keyword ON knowledge_chunks USING GIN (to_tsvector('simple', content));"
+                "ALTER TABLE knowledge_chunks ADD COLUMN IF NOT EXISTS content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED;"
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_chunks_tsv ON knowledge_chunks USING GIN (content_tsv);")
+            cur.execute("DROP INDEX IF EXISTS idx_knowledge_chunks_keyword;")
+            cur.execute("ALTER TABLE knowledge_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;")
+            cur.execute("SELECT to_regclass('idx_knowledge_chunks_document_chunk') IS NULL;")
+            if cur.fetchone()[0]:
+                # Earlier versions appended a fresh chunk set on every re-ingest; keep only the newest copy.
+                cur.execute(
+                    """
+                    DELETE FROM knowledge_chunks older
+                    USING knowledge_chunks newer
+                    WHERE older.document_id = newer.document_id
+                      AND older.chunk_index = newer.chunk_index
+                      AND (older.created_at, older.id) < (newer.created_at, newer.id);
+                    """
+                )
+            cur.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_knowledge_chunks_document_chunk ON knowledge_chunks (document_id, chunk_index);"
             )
+    init_checkpoints(os.environ["DATABASE_URL"])
 
 
-def persist_run(state: OrchestratorState):
-    conn = get_conn()
-    if conn is None:
+def init_checkpoints(dsn: str) -> None:
+    from langgraph.checkpoint.postgres import PostgresSaver
+
+    # The checkpoint migrations create indexes concurrently, which cannot run inside a pooled transaction.
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        PostgresSaver(conn).setup()
+
+
+PersistRecord = Tuple[Tuple[Any, ...], List[Tuple[Any, ...]]]
+
+
+def run_record(state: OrchestratorState) -> PersistRecord:
+    run_row = (
+        state["run_id"],
+        state["session_id"],
+        state["prompt"],
+        state["intent"],
+        state["final_answer"],
+        state["step_hash"],
+        json.dumps(state["metadata"]),
+        now_iso(),
+        state["metadata"].get("parent_run_id"),
+    )
+    step_rows = [
+        (
+            step["id"],
+            state["run_id"],
+            step["node"],
+            json.dumps(step["payload"]),
+            step["step_hash"],
+            step["created_at"],
+        )
+        for step in state["steps"]
+    ]
+    return run_row, step_rows
+
+
+def run_records(state: OrchestratorState) -> List[PersistRecord]:
+    """Records for a run followed by every sub-agent run it spawned, depth first."""
+    records = [run_record(state)]
+    for child in state.get("child_runs", []):
+        records.extend(run_records(child))
+    return records
+
+
+def write_run_records(records: List[PersistRecord]) -> None:
+    pool = get_pool()
+    if pool is None or not records:
         return
-    with conn:
+    with pool.connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO graph_runs (id, session_id, prompt, intent, final_answer, step_hash, metadata, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s::jsonb, %s)
-                """,
-                (
-                    state["run_id"],
-                    state["session_id"],
-                    state["prompt"],
-                    state["intent"],
-                    state["final_answer"],
-                    state["step_hash"],
-                    json.dumps(state["metadata"]),
-                    now_iso(),
-                ),
-            )
+            with cur.copy(
+                "COPY graph_runs (id, session_id, prompt, intent, final_answer, step_hash, metadata, created_at, parent_run_id) FROM STDIN"
+            ) as copy:
+                for run_row, _ in records:
+                    copy.write_row(run_row)
+            with cur.copy("COPY graph_steps (id, run_id, node, payload, step_hash, created_at) FROM STDIN") as copy:
+                for _, step_rows in records:
+                    for step_row in step_rows:
+                        copy.write_row(step_row)
+
+
+async def awrite_run_records(records: List[PersistRecord]) -> None:
+    pool = await aget_pool()
+    if pool is None or not records:
+        return
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            async with cur.copy(
+                "COPY graph_runs (id, session_id, prompt, intent, final_answer, step_hash, metadata, created_at, parent_run_id) FROM STDIN"
+            ) as copy:
+                for run_row, _ in records:
+                    await copy.write_row(run_row)
+            async with cur.copy("COPY graph_steps (id, run_id, node, payload, step_hash, created_at) FROM STDIN") as copy:
+                for _, step_rows in records:
+                    for step_row in step_rows:
+                        await copy.write_row(step_row)
+
+
+class RunPersister:
+    """Write-behind queue that batches graph runs from many requests into one transaction."""
+
+    def __init__(
+        self,
+        writer: Callable[[List[PersistRecord]], None],
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+    ):
+        self.writer = writer
+        self.queue: "queue.Queue[PersistRecord]" = queue.Queue(maxsize=max(1, max_queue))
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.01, flush_interval)
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._loop, name="run-persister", daemon=True)
+            self.thread.start()
+
+    def submit(self, record: PersistRecord) -> bool:
+        self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            return False
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is None:
+            return
+        self.stop_event.set()
+        thread.join(timeout)
+
+    def _drain(self, first: PersistRecord) -> List[PersistRecord]:
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.stop_event.is_set():
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return
+                continue
+            self.flush(self._drain(first))
+
+    def flush(self, batch: List[PersistRecord]) -> None:
+        start = time.perf_counter()
+        try:
+            self.writer(batch)
+            PERSIST_RUNS_TOTAL.labels(mode="write_behind", result="ok").inc(len(batch))
+        except Exception:
+            LOGGER.exception("Batched persistence of %d graph runs failed; retrying one by one", len(batch))
+            for record in batch:
+                try:
+                    self.writer([record])
+                    PERSIST_RUNS_TOTAL.labels(mode="write_behind", result="ok").inc()
+                except Exception:
+                    LOGGER.exception("Dropping graph run %s after persistence failure", record[0][0])
+                    PERSIST_RUNS_TOTAL.labels(mode="write_behind", result="error").inc()
+        finally:
+            PERSIST_FLUSH_SECONDS.observe(time.perf_counter() - start)
+
+
+PERSISTER = RunPersister(
+    writer=write_run_records,
+    max_queue=PERSIST_QUEUE_SIZE,
+    batch_size=PERSIST_BATCH_SIZE,
+    flush_interval=PERSIST_FLUSH_INTERVAL_SECONDS,
+)
+PERSIST_QUEUE_DEPTH.set_function(lambda: PERSISTER.queue.qsize())
+
+
+def queue_run_records(records: List[PersistRecord]) -> List[PersistRecord]:
+    """Hand records to the write-behind queue; returns whatever must still be written synchronously."""
+    if PERSIST_MODE != "write_behind":
+        return records
+    for position, record in enumerate(records):
+        if not PERSISTER.submit(record):
+            PERSIST_RUNS_TOTAL.labels(mode="write_behind", result="queue_full").inc(len(records) - position)
+            return records[position:]
+    return []
 
-            for step in state["steps"]:
-                cur.execute(
-                    """
-                    INSERT INTO graph_steps (id, run_id, node, payload, step_hash, created_at)
-                    VALUES (%s, %s, %s, %s::jsonb, %s, %s)
-                    """,
-                    (
-                        step["id"],
-                        state["run_id"],
-                        step["node"],
-                        json.dumps(step["payload"]),
-                        step["step_hash"],
-                        step["created_at"],
-                    ),
-                )
 
+def persist_run(state: OrchestratorState):
+    if get_pool() is None:
+        return
+    pending = queue_run_records(run_records(state))
+    if pending:
+        write_run_records(pending)
+        PERSIST_RUNS_TOTAL.labels(mode="sync", result="ok").inc(len(pending))
 
-def tokenize(text: str) -> List[str]:
-    return re.findall(r"[a-zA-Z0-9_]+", text.lower())
+
+async def apersist_run(state: OrchestratorState):
+    if not os.getenv("DATABASE_URL", ""):
+        return
+    pending = queue_run_records(run_records(state))
+    if pending:
+        await awrite_run_records(pending)
+        PERSIST_RUNS_TOTAL.labels(mode="sync", result="ok").inc(len(pending))
 
 
 def embed_text(text: str) -> List[float]:
-    vec = [0.0] * EMBEDDING_DIM
-    tokens = tokenize(text)
-    if not tokens:
-        return vec
-    for tok in tokens:
-        digest = hashlib.sha256(tok.encode("utf-8")).digest()
-        idx = int.from_bytes(digest[:4], "big") % EMBEDDING_DIM
-        sign = 1.0 if digest[4] % 2 == 0 else -1.0
-        magnitude = 1.0 + (digest[5] / 255.0)
-        vec[idx] += sign * magnitude
-    norm = math.sqrt(sum(x * x for x in vec))
-    if norm == 0:
-        return vec
-    return [x / norm for x in vec]
-
-
-def cosine_similarity(a: List[float], b: List[float]) -> float:
-    if len(a) != len(b):
-        return 0.0
-    return sum(x * y for x, y in zip(a, b))
+    return embed_texts([text])[0].tolist()
+
+
+class MemoryKnowledgeStore:
+    """In-memory knowledge backend: a contiguous float32 embedding matrix with parallel id/record arrays,
+    plus an incrementally maintained inverted index for BM25 keyword scoring.
+
+    Replaced or removed chunks are tombstoned and skipped by both search legs; rows are compacted once
+    tombstones outnumber live chunks.
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        self.initial_capacity = max(1, initial_capacity)
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self.lock:
+            self._reset(self.initial_capacity)
+
+    def _reset(self, capacity: int) -> None:
+        self.matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.ids: List[str] = []
+        self.records: List[Dict[str, Any]] = []
+        self.documents: Dict[str, Dict[int, int]] = {}
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.total_length = 0
+        self.live_count = 0
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def __iter__(self):
+        with self.lock:
+            return iter([record for row, record in enumerate(self.records) if self.alive[row]])
+
+    def _reserve(self, size: int) -> None:
+        capacity = self.matrix.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[: len(self.ids)] = self.matrix[: len(self.ids)]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(self.ids)] = self.alive[: len(self.ids)]
+        self.matrix = grown
+        self.alive = alive
+
+    def extend(self, records: List[Dict[str, Any]], embeddings: Any) -> None:
+        if not records:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(records), self.dim)
+        with self.lock:
+            for record in records:
+                row = self.documents.get(record.get("document_id", ""), {}).get(record.get("chunk_index", -1))
+                if row is not None:
+                    self._tombstone(row)
+            self._append(records, vectors)
+            self._maybe_compact()
+
+    def _append(self, records: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        start = len(self.ids)
+        self._reserve(start + len(records))
+        self.matrix[start : start + len(records)] = vectors
+        self.alive[start : start + len(records)] = True
+        self.ids.extend(record["id"] for record in records)
+        self.records.extend(records)
+        self.live_count += len(records)
+        for row, record in enumerate(records, start=start):
+            self._index(row, record.get("content", ""))
+            if "document_id" in record and "chunk_index" in record:
+                self.documents.setdefault(record["document_id"], {})[record["chunk_index"]] = row
+
+    def _index(self, row: int, content: str) -> None:
+        terms = tokenize(content)
+        for term, tf in collections.Counter(terms).items():
+            self.postings.setdefault(term, []).append((row, tf))
+        self.doc_lengths.append(len(terms))
+        self.total_length += len(terms)
+
+    def _tombstone(self, row: int) -> None:
+        if not self.alive[row]:
+            return
+        record = self.records[row]
+        self.alive[row] = False
+        self.live_count -= 1
+        self.total_length -= self.doc_lengths[row]
+        chunks = self.documents.get(record.get("document_id", ""), {})
+        if chunks.get(record.get("chunk_index")) == row:
+            del chunks[record["chunk_index"]]
+            if not chunks:
+                self.documents.pop(record["document_id"], None)
+
+    def _maybe_compact(self) -> None:
+        dead = len(self.ids) - self.live_count
+        if dead < max(self.initial_capacity, self.live_count):
+            return
+        rows = np.flatnonzero(self.alive[: len(self.ids)])
+        vectors = self.matrix[rows]
+        records = [self.records[row] for row in rows]
+        self._reset(max(self.initial_capacity, len(records)))
+        self._append(records, vectors)
+
+    def append(self, record: Dict[str, Any], embedding: Any) -> None:
+        self.extend([record], [embedding])
+
+    def document_hashes(self, document_id: str) -> Dict[int, str]:
+        with self.lock:
+            chunks = self.documents.get(document_id, {})
+            return {idx: self.records[row].get("content_hash", "") for idx, row in chunks.items()}
+
+    def remove_chunks(self, document_id: str, min_chunk_index: int) -> int:
+        with self.lock:
+            chunks = self.documents.get(document_id, {})
+            rows = [row for idx, row in chunks.items() if idx >= min_chunk_index]
+            for row in rows:
+                self._tombstone(row)
+            self._maybe_compact()
+        return len(rows)
+
+    def search(self, query_embedding: Any, top_k: int) -> List[Dict[str, Any]]:
+        with self.lock:
+            size = len(self.ids)
+            live = self.live_count
+            matrix = self.matrix
+            alive = self.alive[:size].copy()
+            records = self.records
+        if live == 0 or top_k <= 0:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = matrix[:size] @ query
+        if live < size:
+            scores[~alive] = -np.inf
+        k = min(top_k, live)
+        if k < size:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(size)
+        ordered = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [{**records[idx], "score": float(scores[idx])} for idx in ordered]
+
+    def keyword_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+        scores: Dict[int, float] = {}
+        with self.lock:
+            size = self.live_count
+            if size == 0 or top_k <= 0 or not terms:
+                return []
+            avg_length = self.total_length / size or 1.0
+            for term in terms:
+                postings = [(row, tf) for row, tf in self.postings.get(term, []) if self.alive[row]]
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (size - len(postings) + 0.5) / (len(postings) + 0.5))
+                for row, tf in postings:
+                    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_lengths[row] / avg_length)
+                    scores[row] = scores.get(row, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+            records = self.records
+        ranked = heapq.nsmallest(top_k, scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [{**records[row], "score": score} for row, score in ranked]
+
+
+MEMORY_KNOWLEDGE = MemoryKnowledgeStore(EMBEDDING_DIM, MEMORY_INITIAL_CAPACITY)
 
 
 def vector_literal(vec: List[float]) -> str:
     return "[" + ",".join(f"{x:.6f}" for x in vec) + "]"
 
 
-def split_chunks(text: str, chunk_size: int, overlap: int) -> List[str]:
-    words = text.split()
-    if not words:
-        return []
-    chunks: List[str] = []
-    start = 0
+def iter_text_pieces(text: str, size: int = INGEST_TEXT_PIECE_CHARS) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+def iter_words(pieces: Iterable[str]) -> Iterator[str]:
+    """Whitespace-separated words of text that arrives in pieces; a word cut at a piece boundary is rejoined."""
+    carry = ""
+    for piece in pieces:
+        text = carry + piece
+        words = text.split()
+        carry = words.pop() if words and not text[-1].isspace() else ""
+        yield from words
+    if carry:
+        yield carry
+
+
+def iter_chunks(words: Iterable[str], chunk_size: int, overlap: int) -> Iterator[str]:
+    """Overlapping chunks of `chunk_size` words advancing by `chunk_size - overlap`, holding one chunk of words at a time."""
     step = max(1, chunk_size - overlap)
-    while start < len(words):
-        end = min(len(words), start + chunk_size)
-        chunks.append(" ".join(words[start:end]))
-        if end >= len(words):
-            break
-        start += step
-    return chunks
+    window: Deque[str] = collections.deque()
+    fresh = 0
+    for word in words:
+        window.append(word)
+        fresh += 1
+        if len(window) >= chunk_size:
+            yield " ".join(window)
+            fresh = 0
+            for _ in range(min(step, len(window))):
+                window.popleft()
+    if fresh:
+        yield " ".join(window)
 
 
-def ingest_document_chunks(
-    content: str,
+def split_chunks(text: str, chunk_size: int, overlap: int) -> List[str]:
+    return list(iter_chunks(iter_words(iter_text_pieces(text)), chunk_size, overlap))
+
+
+class LRUTTLCache:
+    """Bounded, thread-safe LRU cache with optional per-entry TTL; reports hits/misses/evictions to Prometheus."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float = 0.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: "collections.OrderedDict[Any, Tuple[float, Any]]" = collections.OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                CACHE_EVENTS_TOTAL.labels(cache=self.name, event="miss").inc()
+                return default
+            expires_at, value = entry
+            if expires_at and expires_at <= time.monotonic():
+                del self.entries[key]
+                CACHE_EVENTS_TOTAL.labels(cache=self.name, event="expired").inc()
+                CACHE_EVENTS_TOTAL.labels(cache=self.name, event="miss").inc()
+                return default
+            self.entries.move_to_end(key)
+        CACHE_EVENTS_TOTAL.labels(cache=self.name, event="hit").inc()
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl > 0 else 0.0
+        evicted = 0
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            CACHE_EVENTS_TOTAL.labels(cache=self.name, event="eviction").inc(evicted)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class RedisSearchCache:
+    """Search cache and knowledge generation shared by all replicas through Redis.
+
+    Redis errors never fail a request: reads become misses, writes are dropped and both are logged.
+    """
+
+    GENERATION_KEY = "hephaestus:orchestrator:knowledge_generation"
+
+    def __init__(self, url: str, ttl: float):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.RedisError
+        self.ttl = max(1, int(ttl)) if ttl > 0 else None
+
+    def unavailable(self, operation: str, exc: Exception) -> None:
+        LOGGER.warning("redis search cache %s failed: %s", operation, exc)
+        CACHE_EVENTS_TOTAL.labels(cache="search", event="error").inc()
+
+    def generation(self) -> int:
+        try:
+            return int(self.client.get(self.GENERATION_KEY) or 0)
+        except self.errors as exc:
+            self.unavailable("generation read", exc)
+            # A value no cache entry was ever keyed with, so every generation-scoped lookup misses until Redis is back.
+            return -time.monotonic_ns()
+
+    def bump_generation(self) -> int:
+        try:
+            return int(self.client.incr(self.GENERATION_KEY))
+        except self.errors as exc:
+            self.unavailable("generation bump", exc)
+            return -time.monotonic_ns()
+
+    def get(self, key: str) -> Any:
+        try:
+            raw = self.client.get(f"hephaestus:orchestrator:search:{key}")
+        except self.errors as exc:
+            self.unavailable("get", exc)
+            raw = None
+        if raw is None:
+            CACHE_EVENTS_TOTAL.labels(cache="search", event="miss").inc()
+            return None
+        CACHE_EVENTS_TOTAL.labels(cache="search", event="hit").inc()
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            self.client.set(f"hephaestus:orchestrator:search:{key}", json.dumps(value), ex=self.ttl)
+        except self.errors as exc:
+            self.unavailable("set", exc)
+
+    def clear(self) -> None:
+        self.bump_generation()
+
+
+SEARCH_CACHE: Any = (
+    RedisSearchCache(SEARCH_CACHE_REDIS_URL, SEARCH_CACHE_TTL_SECONDS)
+    if SEARCH_CACHE_REDIS_URL
+    else LRUTTLCache("search", SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS)
+)
+KNOWLEDGE_GENERATION = 0
+KNOWLEDGE_GENERATION_LOCK = threading.Lock()
+
+
+def knowledge_generation() -> int:
+    if isinstance(SEARCH_CACHE, RedisSearchCache):
+        return SEARCH_CACHE.generation()
+    return KNOWLEDGE_GENERATION
+
+
+def bump_knowledge_generation() -> int:
+    global KNOWLEDGE_GENERATION
+    if isinstance(SEARCH_CACHE, RedisSearchCache):
+        return SEARCH_CACHE.bump_generation()
+    with KNOWLEDGE_GENERATION_LOCK:
+        KNOWLEDGE_GENERATION += 1
+        return KNOWLEDGE_GENERATION
+
+
+def search_cache_key(query: str, top_k: int, probes: Optional[int]) -> str:
+    normalized = " ".join(query.lower().split())
+    blob = json.dumps([knowledge_generation(), top_k, probes or 0, normalized], ensure_ascii=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def chunk_content_hash(chunk: str, metadata: Dict[str, Any]) -> str:
+    blob = json.dumps({"content": chunk, "metadata": metadata}, sort_keys=True, ensure_ascii=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def chunk_record(
     document_id: str,
+    chunk_index: int,
+    chunk: str,
     metadata: Dict[str, Any],
-    chunk_size: int,
-    chunk_overlap: int,
+    content_hash: str,
 ) -> Dict[str, Any]:
-    chunks = split_chunks(content, chunk_size, chunk_overlap)
-    if not chunks:
-        return {"document_id": document_id, "ingested": 0, "backend": "none"}
+    return {
+        "id": f"chunk_{uuid4()}",
+        "document_id": document_id,
+        "chunk_index": chunk_index,
+        "content": chunk,
+        "content_hash": content_hash,
+        "metadata": metadata,
+        "created_at": now_iso(),
+    }
 
-    conn = get_conn()
-    created_ids: List[str] = []
 
-    if conn is None:
-        for idx, chunk in enumerate(chunks):
-            chunk_id = f"chunk_{uuid4()}"
-            MEMORY_KNOWLEDGE.append(
-                {
-                    "id": chunk_id,
-                    "document_id": document_id,
-                    "chunk_index": idx,
-                    "content": chunk,
-                    "metadata": metadata,
-                    "embedding": embed_text(chunk),
-                    "created_at": now_iso(),
-                }
-            )
-            created_ids.append(chunk_id)
-        return {"document_id": document_id, "ingested": len(created_ids), "backend": "memory"}
+def iter_batches(items: List[Any], size: int):
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield start, items[start : start + size]
 
-    with conn:
-        with conn.cursor() as cur:
-            for idx, chunk in enumerate(chunks):
-                chunk_id = f"chunk_{uuid4()}"
+
+def ingest_summary(
+    document_id: str,
+    backend: str,
+    existing: Dict[int, str],
+    changed: List[int],
+    total: int,
+    removed: int,
+) -> Dict[str, Any]:
+    updated = len([idx for idx in changed if idx in existing])
+    return {
+        "document_id": document_id,
+        "ingested": len(changed),
+        "added": len(changed) - updated,
+        "updated": updated,
+        "unchanged": total - len(changed),
+        "removed": removed,
+        "backend": backend,
+    }
+
+
+def prefetch(items: Iterable[Any], depth: int) -> Iterator[Any]:
+    """Produce `items` on a background thread, at most `depth` ahead of the consumer."""
+    if depth <= 0:
+        yield from items
+        return
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    finished = object()
+
+    def put(entry: Tuple[Any, Optional[BaseException]]) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except BaseException as exc:
+            put((finished, exc))
+            return
+        put((finished, None))
+
+    threading.Thread(target=produce, name="orchestrator-prefetch", daemon=True).start()
+    try:
+        while True:
+            item, exc = buffer.get()
+            if item is finished:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+EMBED_POOL: Optional[ProcessPoolExecutor] = None
+EMBED_POOL_LOCK = threading.Lock()
+
+
+def get_embed_pool() -> Optional[ProcessPoolExecutor]:
+    """Lazily started embedding worker pool, or None when `ORCH_EMBED_PROCESSES` is below 2."""
+    global EMBED_POOL
+    if EMBED_PROCESSES < 2:
+        return None
+    with EMBED_POOL_LOCK:
+        if EMBED_POOL is None:
+            # forkserver: forking a process that already runs request threads can copy held locks into the child.
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                # Workers are forked from a server that already imported the embedding code, and nothing else.
+                context.set_forkserver_preload(["embedding"])
+            EMBED_POOL = ProcessPoolExecutor(EMBED_PROCESSES, mp_context=context)
+            EMBED_POOL_WORKERS.set(EMBED_PROCESSES)
+        return EMBED_POOL
+
+
+def close_embed_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """Shut the embedding pool down; with `pool`, only if it is still the current one (e.g. after it broke)."""
+    global EMBED_POOL
+    with EMBED_POOL_LOCK:
+        if EMBED_POOL is None or (pool is not None and pool is not EMBED_POOL):
+            return
+        closing, EMBED_POOL = EMBED_POOL, None
+        EMBED_POOL_WORKERS.set(0)
+    closing.shutdown(wait=pool is None, cancel_futures=True)
+
+
+def embed_inline(texts: List[str]) -> np.ndarray:
+    with EMBED_BATCH_SECONDS.labels("inline").time():
+        return embed_texts(texts)
+
+
+def embed_batches(batches: Iterable[List[Tuple[int, str, str]]]) -> Iterator[Tuple[List[Tuple[int, str, str]], np.ndarray]]:
+    """Embed `(idx, chunk, hash)` batches and yield them in order with their embeddings.
+
+    The first `EMBED_PROCESS_MIN_CHUNKS` chunks are embedded in-process; past that, batches are sharded
+    across the process pool with up to two batches queued per worker.
+    """
+    pending: Deque[Tuple[List[Tuple[int, str, str]], Future]] = collections.deque()
+    pool: Optional[ProcessPoolExecutor] = None
+    inline_only = False
+    seen = 0
+
+    def collect() -> Tuple[List[Tuple[int, str, str]], np.ndarray]:
+        batch, future = pending.popleft()
+        try:
+            embeddings, seconds = future.result()
+        except BrokenProcessPool:
+            LOGGER.warning("embedding worker pool broke; embedding batch in-process")
+            close_embed_pool(pool)
+            return batch, embed_inline([item[1] for item in batch])
+        EMBED_BATCH_SECONDS.labels("process").observe(seconds)
+        return batch, embeddings
+
+    try:
+        for batch in batches:
+            seen += len(batch)
+            if pool is None and not inline_only and seen > EMBED_PROCESS_MIN_CHUNKS:
+                pool = get_embed_pool()
+                inline_only = pool is None
+            if pool is not None:
+                try:
+                    future = pool.submit(embed_batch_timed, [item[1] for item in batch])
+                except (BrokenProcessPool, RuntimeError):
+                    LOGGER.warning("embedding worker pool unavailable; finishing ingest in-process")
+                    close_embed_pool(pool)
+                    pool, inline_only = None, True
+            if pool is None:
+                while pending:
+                    yield collect()
+                yield batch, embed_inline([item[1] for item in batch])
+                continue
+            EMBED_POOL_IN_FLIGHT.inc()
+            future.add_done_callback(lambda _: EMBED_POOL_IN_FLIGHT.dec())
+            pending.append((batch, future))
+            while len(pending) >= 2 * EMBED_PROCESSES:
+                yield collect()
+        while pending:
+            yield collect()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def iter_changed_batches(
+    chunks: Iterable[str],
+    metadata: Dict[str, Any],
+    existing: Dict[int, str],
+    progress: Dict[str, Any],
+) -> Iterator[List[Tuple[int, str, str]]]:
+    """Hash chunks as they arrive and yield the changed ones as `(idx, chunk, hash)` batches of `EMBED_BATCH_SIZE`.
+
+    `progress` collects the chunk total and changed indexes once the iterator is exhausted.
+    """
+    batch: List[Tuple[int, str, str]] = []
+    for idx, chunk in enumerate(chunks):
+        progress["total"] = idx + 1
+        content_hash = chunk_content_hash(chunk, metadata)
+        if existing.get(idx) == content_hash:
+            continue
+        progress["changed"].append(idx)
+        batch.append((idx, chunk, content_hash))
+        if len(batch) >= EMBED_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_spooled(spool: Any) -> Iterator[Any]:
+    """Objects pickled one after another into a spool file, read back from its current position."""
+    while True:
+        try:
+            yield pickle.load(spool)
+        except EOFError:
+            return
+
+
+def ingest_document_chunks(
+    content: Union[str, Iterable[str]],
+    document_id: str,
+    metadata: Dict[str, Any],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Dict[str, Any]:
+    """Chunk, embed and store a document given as a string or as an iterable of text pieces.
+
+    Chunking, hashing and embedding run one batch ahead of the writer, so memory stays bounded by a few
+    batches of chunks however large the document is.
+    """
+    pieces = iter_text_pieces(content) if isinstance(content, str) else content
+    chunks = iter_chunks(iter_words(pieces), chunk_size, chunk_overlap)
+    progress: Dict[str, Any] = {"total": 0, "changed": []}
+    pool = get_pool()
+
+    if pool is None:
+        existing = MEMORY_KNOWLEDGE.document_hashes(document_id)
+        batches = prefetch(embed_batches(iter_changed_batches(chunks, metadata, existing, progress)), INGEST_PIPELINE_DEPTH)
+        written = removed = 0
+        try:
+            with contextlib.closing(batches):
+                for batch, embeddings in batches:
+                    records = [chunk_record(document_id, idx, chunk, metadata, content_hash) for idx, chunk, content_hash in batch]
+                    MEMORY_KNOWLEDGE.extend(records, embeddings)
+                    written += len(records)
+            removed = MEMORY_KNOWLEDGE.remove_chunks(document_id, progress["total"])
+        finally:
+            # Batches written before a failure stay searchable, so cached results from before them must go.
+            if written or removed:
+                bump_knowledge_generation()
+        return ingest_summary(document_id, "memory", existing, progress["changed"], progress["total"], removed)
+
+    metadata_json = json.dumps(metadata)
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT chunk_index, content_hash FROM knowledge_chunks WHERE document_id = %s", (document_id,))
+        existing = {row[0]: row[1] or "" for row in cur.fetchall()}
+    # Embedded rows are spooled to disk while the body is still arriving; a connection is only checked out for
+    # the load, so a slow uploader never holds one idle in a transaction.
+    with tempfile.TemporaryFile() as spool:
+        batches = prefetch(embed_batches(iter_changed_batches(chunks, metadata, existing, progress)), INGEST_PIPELINE_DEPTH)
+        with contextlib.closing(batches):
+            for batch, embeddings in batches:
+                rows = []
+                for offset, (idx, chunk, content_hash) in enumerate(batch):
+                    record = chunk_record(document_id, idx, chunk, metadata, content_hash)
+                    rows.append(
+                        (
+                            record["id"],
+                            document_id,
+                            idx,
+                            chunk,
+                            content_hash,
+                            vector_literal(embeddings[offset].tolist()),
+                            metadata_json,
+                            record["created_at"],
+                        )
+                    )
+                pickle.dump(rows, spool, protocol=pickle.HIGHEST_PROTOCOL)
+        spool.seek(0)
+        with pool.connection() as conn, conn.cursor() as cur:
+            if progress["changed"]:
+                cur.execute(
+                    """
+                    CREATE TEMP TABLE knowledge_chunks_staging (
+                      id TEXT,
+                      document_id TEXT,
+                      chunk_index INTEGER,
+                      content TEXT,
+                      content_hash TEXT,
+                      embedding vector(384),
+                      metadata JSONB,
+                      created_at TIMESTAMPTZ
+                    ) ON COMMIT DROP
+                    """
+                )
+                with cur.copy(
+                    "COPY knowledge_chunks_staging (id, document_id, chunk_index, content, content_hash, embedding, metadata, created_at) FROM STDIN"
+                ) as copy:
+                    for rows in iter_spooled(spool):
+                        for row in rows:
+                            copy.write_row(row)
                 cur.execute(
                     """
-                    INSERT INTO knowledge_chunks (id, document_id, chunk_index, content, embedding, metadata, created_at)
-                    VALUES (%s, %s, %s, %s, %s::vector, %s::jsonb, %s)
-                    """,
-                    (
-                        chunk_id,
-                        document_id,
-                        idx,
-                        chunk,
-                        vector_literal(embed_text(chunk)),
-                        json.dumps(metadata),
-                        now_iso(),
-                    ),
+                    INSERT INTO knowledge_chunks (id, document_id, chunk_index, content, content_hash, embedding, metadata, created_at)
+                    SELECT id, document_id, chunk_index, content, content_hash, embedding, metadata, created_at
+                    FROM knowledge_chunks_staging
+                    ON CONFLICT (document_id, chunk_index) DO UPDATE SET
+                      content = EXCLUDED.content,
+                      content_hash = EXCLUDED.content_hash,
+                      embedding = EXCLUDED.embedding,
+                      metadata = EXCLUDED.metadata,
+                      created_at = EXCLUDED.created_at
+                    """
                 )
-                created_ids.append(chunk_id)
-    return {"document_id": document_id, "ingested": len(created_ids), "backend": "postgres"}
+            cur.execute(
+                "DELETE FROM knowledge_chunks WHERE document_id = %s AND chunk_index >= %s",
+                (document_id, progress["total"]),
+            )
+            removed = cur.rowcount
+    summary = ingest_summary(document_id, "postgres", existing, progress["changed"], progress["total"], removed)
+    if progress["changed"] or removed:
+        bump_knowledge_generation()
+    return summary
 
 
-def hybrid_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    conn = get_conn()
-    query_embedding = embed_text(query)
+def ingest_document(payload: Any) -> Dict[str, Any]:
+    try:
+        if isinstance(payload, (str, bytes)):
+            payload = json.loads(payload)
+        req = KnowledgeIngestRequest.model_validate(payload)
+    except (ValueError, TypeError) as exc:
+        document_id = payload.get("document_id") if isinstance(payload, dict) else None
+        return {"ok": False, "document_id": document_id, "error": "invalid_document", "message": str(exc)}
+    document_id = req.document_id or f"doc_{uuid4()}"
+    try:
+        result = ingest_document_chunks(
+            content=req.content,
+            document_id=document_id,
+            metadata=req.metadata,
+            chunk_size=req.chunk_size,
+            chunk_overlap=req.chunk_overlap,
+        )
+    except PoolTimeout:
+        raise
+    except Exception as exc:
+        LOGGER.exception("Bulk ingest failed for document %s", document_id)
+        return {"ok": False, "document_id": document_id, "error": "ingest_failed", "message": str(exc)}
+    return {"ok": True, **result}
 
-    if conn is None:
-        semantic = sorted(
-            MEMORY_KNOWLEDGE,
-            key=lambda item: cosine_similarity(query_embedding, item["embedding"]),
-            reverse=True,
-        )[:top_k]
-        keyword_tokens = set(tokenize(query))
 
-        def kw_score(item: Dict[str, Any]) -> int:
-            words = tokenize(item["content"])
-            return sum(1 for word in words if word in keyword_tokens)
+def ingest_documents(documents: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    for document in documents:
+        yield ingest_document(document)
 
-        keyword = sorted(MEMORY_KNOWLEDGE, key=kw_score, reverse=True)[:top_k]
-        return fuse_results(semantic, keyword, top_k)
 
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, document_id, chunk_index, content, metadata, (1 - (embedding <=> %s::vector)) AS score
-                FROM knowledge_chunks
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-                """,
-                (vector_literal(query_embedding), vector_literal(query_embedding), top_k),
+async def ingest_text_stream(
+    stream: AsyncIterator[bytes],
+    document_id: str,
+    metadata: Dict[str, Any],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Dict[str, Any]:
+    """Ingest a UTF-8 body as it is received: decoded pieces flow through a bounded queue to the ingest thread."""
+    loop = asyncio.get_running_loop()
+    pieces: asyncio.Queue = asyncio.Queue(maxsize=max(1, INGEST_STREAM_QUEUE_PIECES))
+    ingest: Optional[asyncio.Future] = None
+
+    def receive() -> Iterator[str]:
+        while True:
+            piece = asyncio.run_coroutine_threadsafe(pieces.get(), loop).result()
+            if piece is None:
+                return
+            if isinstance(piece, BaseException):
+                raise piece
+            yield piece
+
+    async def send(piece: Any) -> None:
+        nonlocal ingest
+        if ingest is None:
+            ingest = asyncio.ensure_future(
+                run_in_threadpool(ingest_document_chunks, receive(), document_id, metadata, chunk_size, chunk_overlap)
             )
-            semantic_rows = cur.fetchall()
+        put = asyncio.ensure_future(pieces.put(piece))
+        await asyncio.wait({put, ingest}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
 
-            cur.execute(
-                """
-                SELECT id, document_id, chunk_index, content, metadata,
-                       ts_rank_cd(to_tsvector('simple', content), plainto_tsquery('simple', %s)) AS score
-                FROM knowledge_chunks
-                WHERE to_tsvector('simple', content) @@ plainto_tsquery('simple', %s)
-                ORDER BY score DESC
-                LIMIT %s
-                """,
-                (query, query, top_k),
-            )
-            keyword_rows = cur.fetchall()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        async for data in stream:
+            text = decoder.decode(data)
+            if ingest is None and not text.strip():
+                continue
+            await send(text)
+            if ingest.done():
+                break
+        tail = decoder.decode(b"", final=True)
+        if tail.strip() or (ingest is not None and tail):
+            await send(tail)
+    except BaseException as exc:
+        error = exc
+        if isinstance(exc, UnicodeDecodeError):
+            error = HTTPException(status_code=400, detail=f"document body is not valid UTF-8: {exc.reason}")
+        if ingest is not None:
+            await send(error)
+            await asyncio.wait({ingest})
+            if not ingest.cancelled():
+                ingest.exception()
+        if error is exc:
+            raise
+        raise error from exc
+    if ingest is None:
+        raise HTTPException(status_code=400, detail="document body is empty")
+    await send(None)
+    return await ingest
+
+
+async def iter_ndjson_lines(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[bytes]:
+    """Yield the non-blank lines of a byte stream.
+
+    Only each new piece is searched for newlines, and a line's pieces are joined once when it ends, so a line
+    spread over many pieces costs time linear in its length.
+    """
+    pending: List[bytes] = []
+    pending_bytes = 0
+    async for piece in stream:
+        start = 0
+        newline = piece.find(b"\n")
+        while newline >= 0:
+            pending.append(piece[start:newline])
+            line = b"".join(pending).strip()
+            pending, pending_bytes = [], 0
+            if line:
+                yield line
+            start = newline + 1
+            newline = piece.find(b"\n", start)
+        if start < len(piece):
+            pending.append(piece[start:])
+            pending_bytes += len(piece) - start
+        if pending_bytes > max_line_bytes:
+            raise HTTPException(status_code=413, detail="NDJSON line exceeds ORCH_BULK_INGEST_MAX_LINE_BYTES")
+    line = b"".join(pending).strip()
+    if line:
+        yield line
+
+
+HYBRID_SEARCH_SQL = """
+WITH semantic AS (
+  SELECT id, score, ROW_NUMBER() OVER (ORDER BY score DESC, id) AS rnk
+  FROM (
+    SELECT id, 1 - (embedding <=> %(embedding)s::vector) AS score
+    FROM knowledge_chunks
+    ORDER BY embedding <=> %(embedding)s::vector
+    LIMIT %(top_k)s
+  ) nearest
+),
+keyword AS (
+  SELECT id, score, ROW_NUMBER() OVER (ORDER BY score DESC, id) AS rnk
+  FROM (
+    SELECT id, ts_rank_cd(content_tsv, tsq) AS score
+    FROM knowledge_chunks, plainto_tsquery('simple', %(query)s) AS tsq
+    WHERE content_tsv @@ tsq
+    ORDER BY score DESC
+    LIMIT %(top_k)s
+  ) matched
+),
+fused AS (
+  SELECT COALESCE(k.id, s.id) AS id,
+         COALESCE(k.score, s.score) AS score,
+         COALESCE(1.0 / (%(rrf_k)s + s.rnk), 0) + COALESCE(1.0 / (%(rrf_k)s + k.rnk), 0) AS hybrid_score,
+         s.rnk AS semantic_rank,
+         k.rnk AS keyword_rank
+  FROM semantic s
+  FULL OUTER JOIN keyword k ON k.id = s.id
+)
+SELECT c.id, c.document_id, c.chunk_index, c.content, c.metadata, f.score, f.hybrid_score
+FROM fused f
+JOIN knowledge_chunks c ON c.id = f.id
+ORDER BY f.hybrid_score DESC, f.semantic_rank NULLS LAST, f.keyword_rank NULLS LAST
+LIMIT %(top_k)s
+"""
+
+
+def hybrid_search(query: str, top_k: int = 5, probes: Optional[int] = None) -> List[Dict[str, Any]]:
+    key = search_cache_key(query, top_k, probes)
+    cached = SEARCH_CACHE.get(key)
+    if cached is not None:
+        return list(cached)
+    results = hybrid_search_uncached(query, top_k, probes)
+    SEARCH_CACHE.set(key, results)
+    return list(results)
+
+
+async def ahybrid_search(query: str, top_k: int = 5, probes: Optional[int] = None) -> List[Dict[str, Any]]:
+    if isinstance(SEARCH_CACHE, RedisSearchCache):
+        key = await asyncio.to_thread(search_cache_key, query, top_k, probes)
+        cached = await asyncio.to_thread(SEARCH_CACHE.get, key)
+    else:
+        key = search_cache_key(query, top_k, probes)
+        cached = SEARCH_CACHE.get(key)
+    if cached is not None:
+        return list(cached)
+    results = await ahybrid_search_uncached(query, top_k, probes)
+    if isinstance(SEARCH_CACHE, RedisSearchCache):
+        await asyncio.to_thread(SEARCH_CACHE.set, key, results)
+    else:
+        SEARCH_CACHE.set(key, results)
+    return list(results)
+
+
+def memory_hybrid_search(query: str, query_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+    semantic = MEMORY_KNOWLEDGE.search(query_embedding, top_k)
+    keyword = MEMORY_KNOWLEDGE.keyword_search(query, top_k)
+    return fuse_results(semantic, keyword, top_k)
 
-    semantic = [
-        {
-            "id": row[0],
-            "document_id": row[1],
-            "chunk_index": row[2],
-            "content": row[3],
-            "metadata": row[4] or {},
-            "score": float(row[5] or 0.0),
-        }
-        for row in semantic_rows
-    ]
-    keyword = [
+
+def hybrid_search_params(query: str, query_embedding: List[float], top_k: int) -> Dict[str, Any]:
+    return {
+        "embedding": vector_literal(query_embedding),
+        "query": query,
+        "top_k": top_k,
+        "rrf_k": RRF_K,
+    }
+
+
+def hybrid_search_uncached(query: str, top_k: int = 5, probes: Optional[int] = None) -> List[Dict[str, Any]]:
+    pool = get_pool()
+    query_embedding = embed_text(query)
+
+    if pool is None:
+        return memory_hybrid_search(query, query_embedding, top_k)
+
+    probes = probes or IVFFLAT_PROBES
+    with pool.connection() as conn:
+        # Pipelined so the per-transaction probes setting and the fused query share one round-trip.
+        with conn.pipeline():
+            with conn.cursor() as cur:
+                if probes > 0:
+                    cur.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(probes),))
+                cur.execute(HYBRID_SEARCH_SQL, hybrid_search_params(query, query_embedding, top_k))
+                rows = cur.fetchall()
+    return search_rows_to_results(rows)
+
+
+async def ahybrid_search_uncached(query: str, top_k: int = 5, probes: Optional[int] = None) -> List[Dict[str, Any]]:
+    query_embedding = embed_text(query)
+    pool = await aget_pool()
+
+    if pool is None:
+        return memory_hybrid_search(query, query_embedding, top_k)
+
+    probes = probes or IVFFLAT_PROBES
+    async with pool.connection() as conn:
+        async with conn.pipeline():
+            async with conn.cursor() as cur:
+                if probes > 0:
+                    await cur.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(probes),))
+                await cur.execute(HYBRID_SEARCH_SQL, hybrid_search_params(query, query_embedding, top_k))
+                rows = await cur.fetchall()
+    return search_rows_to_results(rows)
+
+
+def prefetch_pending(queries: Iterable[str], top_k: int) -> List[Tuple[str, str]]:
+    pending: Dict[str, str] = {}
+    for query in queries:
+        key = search_cache_key(query, top_k, None)
+        if key not in pending and SEARCH_CACHE.get(key) is None:
+            pending[key] = query
+    return list(pending.items())
+
+
+def memory_search_batch(batch: List[Tuple[str, str]], embeddings: np.ndarray, top_k: int) -> List[List[Dict[str, Any]]]:
+    return [memory_hybrid_search(query, embedding.tolist(), top_k) for (_, query), embedding in zip(batch, embeddings)]
+
+
+def prefetch_searches(queries: Iterable[str], top_k: int = 5) -> int:
+    """Warm SEARCH_CACHE for many queries with one embedding batch and one pipelined round-trip per batch."""
+    pending = prefetch_pending(queries, top_k)
+    pool = get_pool()
+    for _, batch in iter_batches(pending, EMBED_BATCH_SIZE):
+        embeddings = embed_texts([query for _, query in batch])
+        if pool is None:
+            results = memory_search_batch(batch, embeddings, top_k)
+        else:
+            with pool.connection() as conn:
+                with conn.cursor() as cur:
+                    if IVFFLAT_PROBES > 0:
+                        cur.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(IVFFLAT_PROBES),))
+                    cur.executemany(
+                        HYBRID_SEARCH_SQL,
+                        [hybrid_search_params(query, embedding.tolist(), top_k) for (_, query), embedding in zip(batch, embeddings)],
+                        returning=True,
+                    )
+                    results = []
+                    while True:
+                        results.append(search_rows_to_results(cur.fetchall()))
+                        if not cur.nextset():
+                            break
+        for (key, _), result in zip(batch, results):
+            SEARCH_CACHE.set(key, result)
+    return len(pending)
+
+
+async def aprefetch_searches(queries: Iterable[str], top_k: int = 5) -> int:
+    if isinstance(SEARCH_CACHE, RedisSearchCache):
+        pending = await asyncio.to_thread(prefetch_pending, queries, top_k)
+    else:
+        pending = prefetch_pending(queries, top_k)
+    pool = await aget_pool()
+    for _, batch in iter_batches(pending, EMBED_BATCH_SIZE):
+        embeddings = await asyncio.to_thread(embed_texts, [query for _, query in batch])
+        if pool is None:
+            results = await asyncio.to_thread(memory_search_batch, batch, embeddings, top_k)
+        else:
+            async with pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    if IVFFLAT_PROBES > 0:
+                        await cur.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(IVFFLAT_PROBES),))
+                    await cur.executemany(
+                        HYBRID_SEARCH_SQL,
+                        [hybrid_search_params(query, embedding.tolist(), top_k) for (_, query), embedding in zip(batch, embeddings)],
+                        returning=True,
+                    )
+                    results = []
+                    while True:
+                        results.append(search_rows_to_results(await cur.fetchall()))
+                        if not cur.nextset():
+                            break
+        for (key, _), result in zip(batch, results):
+            if isinstance(SEARCH_CACHE, RedisSearchCache):
+                await asyncio.to_thread(SEARCH_CACHE.set, key, result)
+            else:
+                SEARCH_CACHE.set(key, result)
+    return len(pending)
+
+
+def search_rows_to_results(rows: List[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    return [
         {
             "id": row[0],
             "document_id": row[1],
@@ -428,16 +1851,16 @@ def hybrid_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
             "content": row[3],
             "metadata": row[4] or {},
             "score": float(row[5] or 0.0),
+            "hybrid_score": float(row[6] or 0.0),
         }
-        for row in keyword_rows
+        for row in rows
     ]
-    return fuse_results(semantic, keyword, top_k)
 
 
 def fuse_results(semantic: List[Dict[str, Any]], keyword: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
     rrf_scores: Dict[str, float] = {}
     items: Dict[str, Dict[str, Any]] = {}
-    k = 60.0
+    k = RRF_K
 
     for rank, item in enumerate(semantic, start=1):
         item_id = item["id"]
@@ -455,29 +1878,259 @@ def fuse_results(semantic: List[Dict[str, Any]], keyword: List[Dict[str, Any]],
 
 @dataclass
 class CircuitBreaker:
+    """Circuit state for one tool. Stores apply these transitions atomically, possibly across processes."""
+
+    state: str = "closed"
     fail_count: int = 0
     opened_at: float = 0.0
-
-    def is_open(self) -> bool:
-        if self.fail_count < CIRCUIT_FAIL_THRESHOLD:
-            return False
-        if time.time() - self.opened_at >= CIRCUIT_RESET_SECONDS:
-            self.fail_count = 0
-            self.opened_at = 0.0
-            return False
+    probes: int = 0
+
+    def admit(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if now - self.opened_at < CIRCUIT_RESET_SECONDS:
+            if self.state == "open" or self.probes >= CIRCUIT_HALF_OPEN_PROBES:
+                return False
+        elif self.state == "open" or self.probes >= CIRCUIT_HALF_OPEN_PROBES:
+            # Cooled down (or earlier probes never reported back): start a fresh half-open window.
+            self.state = "half_open"
+            self.opened_at = now
+            self.probes = 0
+        self.probes += 1
         return True
 
-    def on_failure(self):
+    def on_failure(self, now: float) -> None:
         self.fail_count += 1
-        if self.fail_count >= CIRCUIT_FAIL_THRESHOLD:
-            self.opened_at = time.time()
+        if self.state == "half_open" or self.fail_count >= CIRCUIT_FAIL_THRESHOLD:
+            self.state = "open"
+            self.opened_at = now
+            self.probes = 0
 
-    def on_success(self):
+    def on_success(self) -> None:
+        self.state = "closed"
         self.fail_count = 0
         self.opened_at = 0.0
-
-
-CIRCUITS: Dict[str, CircuitBreaker] = {}
+        self.probes = 0
+
+
+class LocalCircuitStore:
+    blocking = False
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.circuits: Dict[str, CircuitBreaker] = {}
+
+    def transact(self, name: str, fn: Callable[[CircuitBreaker], Any]) -> Any:
+        with self.lock:
+            return fn(self.circuits.setdefault(name, CircuitBreaker()))
+
+    def reset(self, name: str) -> None:
+        with self.lock:
+            self.circuits.pop(name, None)
+
+
+class SharedMemoryCircuitStore:
+    """Circuit table in a memory-mapped file (tmpfs by default) shared by every worker on the host.
+
+    Slots are keyed by a digest of the tool name; a thread lock plus flock serialise read-modify-write.
+    flock locks belong to an open file description, which forked workers inherit and share, so every
+    process locks through a descriptor it opened itself.
+    """
+
+    blocking = False
+    SLOT = struct.Struct("<16siidi")
+    STATES = ("closed", "open", "half_open")
+
+    def __init__(self, path: str, slots: int = 128):
+        self.path = path
+        self.slots = slots
+        self.lock = threading.Lock()
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = self.SLOT.size * slots
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.fd_pid = os.getpid()
+        self.overflow = LocalCircuitStore()
+
+    def process_fd(self) -> int:
+        """Lock descriptor owned by the calling process; reopened on first use after a fork."""
+        pid = os.getpid()
+        if self.fd_pid != pid:
+            self.fd = os.open(self.path, os.O_RDWR)
+            self.fd_pid = pid
+        return self.fd
+
+    @staticmethod
+    def key(name: str) -> bytes:
+        return hashlib.blake2b(name.encode("utf-8"), digest_size=16).digest()
+
+    @contextlib.contextmanager
+    def locked(self):
+        with self.lock:
+            fd = self.process_fd()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def find_slot(self, key: bytes) -> Optional[int]:
+        free = None
+        for slot in range(self.slots):
+            slot_key = self.map[slot * self.SLOT.size : slot * self.SLOT.size + 16]
+            if slot_key == key:
+                return slot
+            if free is None and slot_key == bytes(16):
+                free = slot
+        return free
+
+    def transact(self, name: str, fn: Callable[[CircuitBreaker], Any]) -> Any:
+        key = self.key(name)
+        with self.locked():
+            slot = self.find_slot(key)
+            if slot is None:
+                LOGGER.warning("circuit table %s is full; keeping %s in process", self.path, name)
+                return self.overflow.transact(name, fn)
+            offset = slot * self.SLOT.size
+            slot_key, state, fail_count, opened_at, probes = self.SLOT.unpack_from(self.map, offset)
+            if slot_key == key:
+                circuit = CircuitBreaker(self.STATES[state], fail_count, opened_at, probes)
+            else:
+                circuit = CircuitBreaker()
+            result = fn(circuit)
+            self.SLOT.pack_into(
+                self.map, offset, key, self.STATES.index(circuit.state), circuit.fail_count, circuit.opened_at, circuit.probes
+            )
+            return result
+
+    def reset(self, name: str) -> None:
+        key = self.key(name)
+        with self.locked():
+            slot = self.find_slot(key)
+            if slot is not None:
+                self.SLOT.pack_into(self.map, slot * self.SLOT.size, key, 0, 0, 0.0, 0)
+        self.overflow.reset(name)
+
+
+class PostgresCircuitStore:
+    """Circuit state shared across replicas in the tool_circuits table.
+
+    Each process reuses the last state it read for `ORCH_CIRCUIT_CACHE_SECONDS`, so the common no-change case
+    (admitting through a closed circuit, success while closed) needs no database call at all. Only a change
+    takes the row lock and writes. Falls back to in-process state while the database is unavailable.
+    """
+
+    blocking = True
+
+    def __init__(self, cache_seconds: float = CIRCUIT_CACHE_SECONDS):
+        self.fallback = LocalCircuitStore()
+        self.cache_seconds = cache_seconds
+        self.lock = threading.Lock()
+        self.cache: Dict[str, Tuple[float, CircuitBreaker]] = {}
+
+    def cached(self, name: str) -> Optional[CircuitBreaker]:
+        with self.lock:
+            entry = self.cache.get(name)
+        if entry is None or time.monotonic() - entry[0] >= self.cache_seconds:
+            return None
+        return dataclasses.replace(entry[1])
+
+    def remember(self, name: str, circuit: CircuitBreaker) -> None:
+        with self.lock:
+            self.cache[name] = (time.monotonic(), dataclasses.replace(circuit))
+
+    def transact(self, name: str, fn: Callable[[CircuitBreaker], Any]) -> Any:
+        circuit = self.cached(name)
+        if circuit is not None:
+            before = dataclasses.replace(circuit)
+            result = fn(circuit)
+            if circuit == before:
+                return result
+        pool = get_pool()
+        if pool is None:
+            return self.fallback.transact(name, fn)
+        try:
+            with pool.connection() as conn:
+                with conn.cursor() as cur:
+                    if circuit is None:
+                        cur.execute(
+                            "SELECT state, fail_count, opened_at, probes FROM tool_circuits WHERE tool = %s", (name,)
+                        )
+                        row = cur.fetchone()
+                        circuit = CircuitBreaker(*row) if row else CircuitBreaker()
+                        self.remember(name, circuit)
+                        before = dataclasses.replace(circuit)
+                        result = fn(circuit)
+                        if circuit == before:
+                            return result
+                    cur.execute(
+                        "INSERT INTO tool_circuits (tool) VALUES (%s) ON CONFLICT (tool) DO NOTHING", (name,)
+                    )
+                    cur.execute(
+                        "SELECT state, fail_count, opened_at, probes FROM tool_circuits WHERE tool = %s FOR UPDATE",
+                        (name,),
+                    )
+                    circuit = CircuitBreaker(*cur.fetchone())
+                    result = fn(circuit)
+                    cur.execute(
+                        """
+                        UPDATE tool_circuits
+                        SET state = %s, fail_count = %s, opened_at = %s, probes = %s, updated_at = NOW()
+                        WHERE tool = %s
+                        """,
+                        (circuit.state, circuit.fail_count, circuit.opened_at, circuit.probes, name),
+                    )
+                    self.remember(name, circuit)
+                    return result
+        except (psycopg.Error, PoolTimeout):
+            LOGGER.exception("circuit store unavailable; using in-process state for %s", name)
+            return self.fallback.transact(name, fn)
+
+    def reset(self, name: str) -> None:
+        self.fallback.reset(name)
+        with self.lock:
+            self.cache.pop(name, None)
+        pool = get_pool()
+        if pool is not None:
+            with pool.connection() as conn:
+                conn.execute("DELETE FROM tool_circuits WHERE tool = %s", (name,))
+
+
+def build_circuit_store() -> Any:
+    if CIRCUIT_BACKEND == "postgres":
+        return PostgresCircuitStore()
+    if CIRCUIT_BACKEND == "shm":
+        return SharedMemoryCircuitStore(CIRCUIT_SHM_PATH)
+    return LocalCircuitStore()
+
+
+CIRCUIT_STORE = build_circuit_store()
+
+
+def circuit_admits(name: str) -> bool:
+    now = time.time()
+    return CIRCUIT_STORE.transact(name, lambda circuit: circuit.admit(now))
+
+
+def circuit_success(name: str) -> None:
+    CIRCUIT_STORE.transact(name, lambda circuit: circuit.on_success())
+
+
+def circuit_failure(name: str) -> None:
+    now = time.time()
+    CIRCUIT_STORE.transact(name, lambda circuit: circuit.on_failure(now))
+
+
+def reset_circuit(name: str) -> None:
+    CIRCUIT_STORE.reset(name)
+
+
+async def acircuit_call(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a circuit bookkeeping call without blocking the event loop when the store does I/O."""
+    if CIRCUIT_STORE.blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
 
 
 def allowed_hosts() -> List[str]:
@@ -521,12 +2174,16 @@ def tool_web_search(args: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def tool_kb_search(args: Dict[str, Any]) -> Dict[str, Any]:
+def kb_search_args(args: Dict[str, Any]) -> Tuple[str, int, Optional[int]]:
     query = str(args.get("query", "")).strip()
     top_k = int(args.get("top_k", 5))
+    probes = args.get("probes")
     if not query:
         raise ValueError("query is required")
-    results = hybrid_search(query, top_k=top_k)
+    return query, top_k, int(probes) if probes else None
+
+
+def kb_search_output(query: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
     return {
         "tool": "kb_search",
         "status": "ok",
@@ -535,21 +2192,213 @@ def tool_kb_search(args: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def tool_http_fetch(args: Dict[str, Any]) -> Dict[str, Any]:
-    url = str(args.get("url", "")).strip()
-    if not url:
-        raise ValueError("url is required")
-    host = (urlparse(url).hostname or "").lower()
+def tool_kb_search(args: Dict[str, Any]) -> Dict[str, Any]:
+    query, top_k, probes = kb_search_args(args)
+    return kb_search_output(query, hybrid_search(query, top_k=top_k, probes=probes))
+
+
+async def atool_kb_search(args: Dict[str, Any]) -> Dict[str, Any]:
+    query, top_k, probes = kb_search_args(args)
+    return kb_search_output(query, await ahybrid_search(query, top_k=top_k, probes=probes))
+
+
+def http_fetch_url(args: Dict[str, Any]) -> str:
+    url = str(args.get("url", "")).strip()
+    if not url:
+        raise ValueError("url is required")
+    host = (urlparse(url).hostname or "").lower()
     allowlist = allowed_hosts()
     if allowlist and host not in allowlist:
         raise ValueError(f"host not allowed: {host}")
-    resp = requests.get(url, timeout=8)
-    return {
+    return url
+
+
+def http_fetch_headers(args: Dict[str, Any]) -> Dict[str, str]:
+    """Conditional request headers from validators the tool cache passes in for revalidation."""
+    validators = args.get("validators") or {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def http_fetch_output(status_code: int, headers: Any, length: int, truncated: bool) -> Dict[str, Any]:
+    output: Dict[str, Any] = {
         "tool": "http_fetch",
         "status": "ok",
-        "result": f"HTTP {resp.status_code}",
-        "length": len(resp.text),
+        "result": f"HTTP {status_code}",
+        "http_status": status_code,
+        "length": length,
+        "truncated": truncated,
     }
+    validators = {key: headers.get(header) for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified"))}
+    validators = {key: value for key, value in validators.items() if value}
+    if validators:
+        output["validators"] = validators
+    if status_code == 304:
+        output["not_modified"] = True
+    return output
+
+
+def declared_too_large(headers: Any, limit: int) -> bool:
+    declared = headers.get("Content-Length")
+    return declared is not None and declared.isdigit() and int(declared) > limit
+
+
+def read_bounded(chunks: Iterable[bytes], limit: int) -> Tuple[int, bool]:
+    """Count body bytes without buffering them, stopping as soon as `limit` is exceeded."""
+    length = 0
+    for chunk in chunks:
+        length += len(chunk)
+        if length > limit:
+            return limit, True
+    return length, False
+
+
+async def aread_bounded(chunks: AsyncIterator[bytes], limit: int) -> Tuple[int, bool]:
+    length = 0
+    async for chunk in chunks:
+        length += len(chunk)
+        if length > limit:
+            return limit, True
+    return length, False
+
+
+HTTP_SESSION: Optional[requests.Session] = None
+HTTP_SESSION_LOCK = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Keep-alive session shared by tool threads; `HTTP_HOST_LIMITS` caps connections per host.
+
+    The pool itself never blocks: urllib3 has no way to bound that wait, so a busy host could hold a tool
+    thread past its run's deadline.
+    """
+    global HTTP_SESSION
+    if HTTP_SESSION is None:
+        with HTTP_SESSION_LOCK:
+            if HTTP_SESSION is None:
+                session = requests.Session()
+                # pool_connections (how many per-host pools urllib3 keeps) stays at the requests default.
+                adapter = HTTPAdapter(pool_maxsize=max(1, HTTP_MAX_CONNECTIONS_PER_HOST), pool_block=False)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                HTTP_SESSION = session
+    return HTTP_SESSION
+
+
+def close_http_session() -> None:
+    global HTTP_SESSION
+    with HTTP_SESSION_LOCK:
+        session, HTTP_SESSION = HTTP_SESSION, None
+    if session is not None:
+        session.close()
+
+
+class HostLimits:
+    """Per-host connection semaphores, keeping at most `max_hosts` idle hosts (least recently used go first).
+
+    `http_fetch` takes arbitrary URLs, so an unbounded map would gain a semaphore for every host ever seen.
+    A host's semaphore is only dropped while no caller holds or waits on it, so its limit is never split.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_hosts: int):
+        self.factory = factory
+        self.max_hosts = max(1, max_hosts)
+        self.lock = threading.Lock()
+        self.entries: "collections.OrderedDict[str, List[Any]]" = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @contextlib.contextmanager
+    def hold(self, url: str) -> Iterator[Any]:
+        """The semaphore for the URL's host, pinned for the duration of the block."""
+        host = (urlparse(url).hostname or "").lower()
+        with self.lock:
+            entry = self.entries.get(host)
+            if entry is None:
+                entry = self.entries[host] = [self.factory(), 0]
+            self.entries.move_to_end(host)
+            entry[1] += 1
+            self.evict()
+        try:
+            yield entry[0]
+        finally:
+            with self.lock:
+                entry[1] -= 1
+
+    def evict(self) -> None:
+        excess = len(self.entries) - self.max_hosts
+        for host in list(self.entries)[:max(0, excess)]:
+            if self.entries[host][1] == 0:
+                del self.entries[host]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+HTTP_HOST_LIMITS = HostLimits(lambda: threading.BoundedSemaphore(max(1, HTTP_MAX_CONNECTIONS_PER_HOST)), HTTP_MAX_TRACKED_HOSTS)
+
+
+def tool_http_fetch(args: Dict[str, Any]) -> Dict[str, Any]:
+    url = http_fetch_url(args)
+    wait = budgeted_timeout(HTTP_TIMEOUT_SECONDS)
+    with HTTP_HOST_LIMITS.hold(url) as limit:
+        if not limit.acquire(timeout=wait):
+            raise TimeoutError(f"no free connection to {urlparse(url).hostname} within {wait:.3f}s")
+        try:
+            with get_http_session().get(
+                url, headers=http_fetch_headers(args), timeout=budgeted_timeout(HTTP_TIMEOUT_SECONDS), stream=True
+            ) as resp:
+                if declared_too_large(resp.headers, HTTP_FETCH_MAX_BYTES):
+                    return http_fetch_output(resp.status_code, resp.headers, HTTP_FETCH_MAX_BYTES, True)
+                length, truncated = read_bounded(resp.iter_content(HTTP_FETCH_CHUNK_BYTES), HTTP_FETCH_MAX_BYTES)
+                return http_fetch_output(resp.status_code, resp.headers, length, truncated)
+        finally:
+            limit.release()
+
+
+ASYNC_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+# httpx only bounds connections globally, so per-host limits are enforced here.
+ASYNC_HOST_LIMITS = HostLimits(lambda: asyncio.Semaphore(max(1, HTTP_MAX_CONNECTIONS_PER_HOST)), HTTP_MAX_TRACKED_HOSTS)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global ASYNC_HTTP_CLIENT
+    if ASYNC_HTTP_CLIENT is None:
+        ASYNC_HTTP_CLIENT = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+    return ASYNC_HTTP_CLIENT
+
+
+async def aclose_http_client() -> None:
+    global ASYNC_HTTP_CLIENT
+    client, ASYNC_HTTP_CLIENT = ASYNC_HTTP_CLIENT, None
+    ASYNC_HOST_LIMITS.clear()
+    if client is not None:
+        await client.aclose()
+
+
+async def atool_http_fetch(args: Dict[str, Any]) -> Dict[str, Any]:
+    url = http_fetch_url(args)
+    with ASYNC_HOST_LIMITS.hold(url) as limit:
+        async with limit:
+            async with get_async_http_client().stream(
+                "GET", url, headers=http_fetch_headers(args), timeout=budgeted_timeout(HTTP_TIMEOUT_SECONDS)
+            ) as resp:
+                if declared_too_large(resp.headers, HTTP_FETCH_MAX_BYTES):
+                    return http_fetch_output(resp.status_code, resp.headers, HTTP_FETCH_MAX_BYTES, True)
+                length, truncated = await aread_bounded(resp.aiter_bytes(HTTP_FETCH_CHUNK_BYTES), HTTP_FETCH_MAX_BYTES)
+                return http_fetch_output(resp.status_code, resp.headers, length, truncated)
 
 
 def tool_code_exec_sandboxed(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -563,12 +2412,161 @@ def tool_code_exec_sandboxed(args: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+TOOL_POOL = ThreadPoolExecutor(max_workers=max(1, TOOL_WORKERS), thread_name_prefix="orchestrator-tool")
 TOOLS = {
     "web_search": tool_web_search,
     "kb_search": tool_kb_search,
     "http_fetch": tool_http_fetch,
     "code_exec_sandboxed": tool_code_exec_sandboxed,
 }
+DEFAULT_TOOLS = dict(TOOLS)
+
+
+# Native coroutine implementations used by the async graph; other tools run in a worker thread.
+ASYNC_TOOLS = {
+    "kb_search": atool_kb_search,
+    "http_fetch": atool_http_fetch,
+}
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """How successful outputs of a built-in tool may be reused.
+
+    `pure` outputs never go stale, `ttl` outputs expire after `ttl` seconds and `http_validator`
+    outputs are fresh for `ttl` seconds, then revalidated with a conditional request. `scope`
+    contributes to the key, so e.g. a knowledge generation bump retires every cached search.
+    """
+
+    kind: str
+    ttl: float = 0.0
+    scope: Optional[Callable[[], Any]] = None
+
+
+@dataclass
+class ToolCacheEntry:
+    output: Dict[str, Any]
+    fresh_until: float
+    validators: Dict[str, str]
+
+
+TOOL_CACHE_POLICIES = {
+    "code_exec_sandboxed": ToolCachePolicy("pure"),
+    "kb_search": ToolCachePolicy("ttl", ttl=SEARCH_CACHE_TTL_SECONDS, scope=knowledge_generation),
+    "http_fetch": ToolCachePolicy("http_validator", ttl=HTTP_FETCH_CACHE_TTL_SECONDS),
+}
+TOOL_CACHE = LRUTTLCache("tools", TOOL_CACHE_SIZE)
+
+
+def tool_cache_key(name: str, policy: ToolCachePolicy, args: Dict[str, Any]) -> str:
+    scope = policy.scope() if policy.scope else None
+    blob = json.dumps({"tool": name, "args": args, "scope": scope}, sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ToolCacheLookup:
+    policy: Optional[ToolCachePolicy] = None
+    key: str = ""
+    entry: Optional[ToolCacheEntry] = None
+
+    @property
+    def status(self) -> str:
+        return "miss" if self.policy else "bypass"
+
+    def hit(self, name: str) -> Optional[Dict[str, Any]]:
+        if self.entry is None or self.entry.fresh_until <= time.monotonic():
+            return None
+        TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="ok", cache="hit").inc()
+        return {**self.entry.output, "cache": "hit", "attempt": 0}
+
+    def call_args(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        if self.entry is None or self.policy is None or self.policy.kind != "http_validator" or not self.entry.validators:
+            return args
+        return {**args, "validators": self.entry.validators}
+
+    def store(self, output: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a fresh tool output, or swap a `not_modified` answer for the revalidated entry."""
+        if self.policy is None:
+            output["cache"] = "bypass"
+            return output
+        if self.policy.kind == "pure" or (self.policy.kind == "ttl" and self.policy.ttl <= 0):
+            fresh_until = math.inf
+        else:
+            fresh_until = time.monotonic() + self.policy.ttl
+        # Validator entries outlive their freshness so they can be revalidated; LRU eviction bounds them.
+        ttl = self.policy.ttl if self.policy.kind == "ttl" else 0.0
+        if output.pop("not_modified", False) and self.entry is not None:
+            validators = output.get("validators") or self.entry.validators
+            TOOL_CACHE.set(self.key, ToolCacheEntry(self.entry.output, fresh_until, validators), ttl=ttl)
+            return {**self.entry.output, "cache": "revalidated"}
+        # Upstream errors (5xx, 404, ...) are successful tool calls but must not be served from cache.
+        if output.get("status") == "ok" and 200 <= output.get("http_status", 200) < 300:
+            TOOL_CACHE.set(self.key, ToolCacheEntry(dict(output), fresh_until, output.get("validators") or {}), ttl=ttl)
+        output["cache"] = "miss"
+        return output
+
+
+def lookup_tool_cache(name: str, tool: Callable[[Dict[str, Any]], Dict[str, Any]], args: Dict[str, Any]) -> ToolCacheLookup:
+    # Policies describe the built-in tools; a tool swapped in at runtime is never cached.
+    policy = TOOL_CACHE_POLICIES.get(name) if tool is DEFAULT_TOOLS.get(name) else None
+    if policy is None:
+        return ToolCacheLookup()
+    key = tool_cache_key(name, policy, args)
+    return ToolCacheLookup(policy, key, TOOL_CACHE.get(key))
+
+
+def open_circuit_output(name: str, cache: str) -> Optional[Dict[str, Any]]:
+    if circuit_admits(name):
+        return None
+    TOOL_CIRCUIT_OPEN_TOTAL.labels(tool=name).inc()
+    TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="circuit_open", cache=cache).inc()
+    return {"tool": name, "status": "error", "error": "circuit_open"}
+
+
+def record_tool_success(name: str, span: Any, output: Dict[str, Any], attempt: int) -> Dict[str, Any]:
+    output["attempt"] = attempt
+    circuit_success(name)
+    span.set_attribute("tool.status", "ok")
+    span.set_attribute("tool.cache", output["cache"])
+    TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="ok", cache=output["cache"]).inc()
+    return output
+
+
+def record_tool_failure(name: str, span: Any, exc: Exception, cache: str) -> str:
+    error = str(exc)
+    circuit_failure(name)
+    span.set_attribute("tool.status", "error")
+    span.set_attribute("tool.error", error)
+    TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="error", cache=cache).inc()
+    return error
+
+
+def deadline_tool_output(name: str, attempt: int, last_error: str, cache: str) -> Dict[str, Any]:
+    DEADLINE_MISSES_TOTAL.labels(stage="tool").inc()
+    TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="deadline_exceeded", cache=cache).inc()
+    output = {"tool": name, "status": "error", "error": "deadline_exceeded", "attempt": attempt}
+    if last_error:
+        output["last_error"] = last_error
+    return output
+
+
+def retry_backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before the next attempt, or -1 when the remaining budget cannot cover it."""
+    delay = random.uniform(0.0, min(TOOL_RETRY_MAX_BACKOFF_SECONDS, TOOL_RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= delay:
+        return -1.0
+    return delay
+
+
+def failed_tool_output(name: str, last_error: str, attempt: int = MAX_EXECUTION_ATTEMPTS) -> Dict[str, Any]:
+    return {
+        "tool": name,
+        "status": "error",
+        "error": last_error or "execution_failed",
+        "attempt": attempt,
+    }
 
 
 def execute_tool_with_resilience(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
@@ -576,57 +2574,171 @@ def execute_tool_with_resilience(name: str, args: Dict[str, Any]) -> Dict[str, A
     if tool is None:
         return {"tool": name, "status": "error", "error": "unknown_tool"}
 
-    circuit = CIRCUITS.setdefault(name, CircuitBreaker())
-    if circuit.is_open():
-        TOOL_CIRCUIT_OPEN_TOTAL.labels(tool=name).inc()
-        TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="circuit_open").inc()
-        return {"tool": name, "status": "error", "error": "circuit_open"}
+    cached = lookup_tool_cache(name, tool, args)
+    hit = cached.hit(name)
+    if hit is not None:
+        return hit
 
+    rejected = open_circuit_output(name, cached.status)
+    if rejected is not None:
+        return rejected
+
+    call_args = cached.call_args(args)
     last_error = ""
     for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
+        if deadline_passed():
+            return deadline_tool_output(name, attempt - 1, last_error, cached.status)
+        # Retries go through the circuit too: a failed half-open probe (or a failure that tripped it) ends the call.
+        if attempt > 1 and not circuit_admits(name):
+            return failed_tool_output(name, last_error, attempt - 1)
         with TRACER.start_as_current_span("tool.execute") as span:
             span.set_attribute("tool.name", name)
             span.set_attribute("tool.attempt", attempt)
             try:
-                output = tool(args)
-                output["attempt"] = attempt
-                circuit.on_success()
-                span.set_attribute("tool.status", "ok")
-                TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="ok").inc()
-                return output
+                return record_tool_success(name, span, cached.store(tool(call_args)), attempt)
             except Exception as exc:
-                last_error = str(exc)
-                circuit.on_failure()
-                span.set_attribute("tool.status", "error")
-                span.set_attribute("tool.error", last_error)
-                TOOL_EXECUTIONS_TOTAL.labels(tool=name, status="error").inc()
+                last_error = record_tool_failure(name, span, exc, cached.status)
                 if attempt < MAX_EXECUTION_ATTEMPTS:
-                    time.sleep(0.2 * attempt)
+                    delay = retry_backoff(attempt)
+                    if delay < 0:
+                        return deadline_tool_output(name, attempt, last_error, cached.status)
+                    time.sleep(delay)
+
+    return failed_tool_output(name, last_error)
 
-    return {
-        "tool": name,
-        "status": "error",
-        "error": last_error or "execution_failed",
-        "attempt": MAX_EXECUTION_ATTEMPTS,
-    }
+
+async def aexecute_tool_with_resilience(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    tool = TOOLS.get(name)
+    if tool is None:
+        return {"tool": name, "status": "error", "error": "unknown_tool"}
+
+    if isinstance(SEARCH_CACHE, RedisSearchCache):
+        # The kb_search policy is scoped by the knowledge generation, which lives in Redis here.
+        cached = await asyncio.to_thread(lookup_tool_cache, name, tool, args)
+    else:
+        cached = lookup_tool_cache(name, tool, args)
+    hit = cached.hit(name)
+    if hit is not None:
+        return hit
+
+    rejected = await acircuit_call(open_circuit_output, name, cached.status)
+    if rejected is not None:
+        return rejected
+
+    # A tool swapped into TOOLS at runtime takes precedence over the built-in coroutine.
+    atool = ASYNC_TOOLS.get(name) if tool is DEFAULT_TOOLS.get(name) else None
+    call_args = cached.call_args(args)
+    last_error = ""
+    for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
+        if deadline_passed():
+            return deadline_tool_output(name, attempt - 1, last_error, cached.status)
+        if attempt > 1 and not await acircuit_call(circuit_admits, name):
+            return failed_tool_output(name, last_error, attempt - 1)
+        with TRACER.start_as_current_span("tool.execute") as span:
+            span.set_attribute("tool.name", name)
+            span.set_attribute("tool.attempt", attempt)
+            try:
+                call = atool(call_args) if atool else asyncio.to_thread(tool, call_args)
+                output = await asyncio.wait_for(call, remaining_budget())
+                return await acircuit_call(record_tool_success, name, span, cached.store(output), attempt)
+            except Exception as exc:
+                if isinstance(exc, asyncio.TimeoutError) and deadline_passed():
+                    # Ran out of budget mid-call: not the tool's fault, so the circuit is left alone.
+                    span.set_attribute("tool.deadline_exceeded", True)
+                    return deadline_tool_output(name, attempt, last_error, cached.status)
+                last_error = await acircuit_call(record_tool_failure, name, span, exc, cached.status)
+                if attempt < MAX_EXECUTION_ATTEMPTS:
+                    delay = retry_backoff(attempt)
+                    if delay < 0:
+                        return deadline_tool_output(name, attempt, last_error, cached.status)
+                    await asyncio.sleep(delay)
+
+    return failed_tool_output(name, last_error)
+
+
+def build_matcher(intents: Dict[str, List[str]], forbidden: List[str]) -> KeywordMatcher:
+    groups: Dict[Any, Iterable[str]] = {("intent", name): words for name, words in intents.items()}
+    groups[("safety", "forbidden")] = forbidden
+    return KeywordMatcher(groups)
+
+
+def load_matcher_patterns(path: str) -> Tuple[Dict[str, List[str]], List[str]]:
+    """Read the patterns file; a missing key keeps the built-in list."""
+    patterns = read_patterns(path)
+    return patterns.get("intents", INTENT_KEYWORDS), patterns.get("forbidden", FORBIDDEN_PATTERNS)
+
+
+MATCHER_LOCK = threading.Lock()
+MATCHER_STATE: Dict[str, Any] = {
+    "matcher": build_matcher(INTENT_KEYWORDS, FORBIDDEN_PATTERNS),
+    "mtime": None,
+    "checked_at": 0.0,
+}
+
+
+def reload_matcher(force: bool = False) -> bool:
+    """Rebuild the matcher if the patterns file changed. A bad file is logged and the previous matcher kept."""
+    if not MATCHER_PATTERNS_PATH:
+        return False
+    with MATCHER_LOCK:
+        MATCHER_STATE["checked_at"] = time.monotonic()
+        try:
+            mtime = os.stat(MATCHER_PATTERNS_PATH).st_mtime_ns
+        except OSError:
+            mtime = -1
+        if not force and mtime == MATCHER_STATE["mtime"]:
+            return False
+        # Recorded before loading, so a bad or missing file is reported once per change rather than on every check.
+        MATCHER_STATE["mtime"] = mtime
+        try:
+            intents, forbidden = load_matcher_patterns(MATCHER_PATTERNS_PATH)
+        except (OSError, ValueError):
+            LOGGER.exception("failed to load matcher patterns from %s", MATCHER_PATTERNS_PATH)
+            MATCHER_RELOADS_TOTAL.labels("error").inc()
+            return False
+        MATCHER_STATE["matcher"] = build_matcher(intents, forbidden)
+        MATCHER_RELOADS_TOTAL.labels("ok").inc()
+        return True
+
+
+def current_matcher() -> KeywordMatcher:
+    if MATCHER_PATTERNS_PATH and time.monotonic() - MATCHER_STATE["checked_at"] >= MATCHER_RELOAD_SECONDS:
+        reload_matcher()
+    return MATCHER_STATE["matcher"]
+
+
+def match_intent(text: str) -> str:
+    matcher = current_matcher()
+    hits = matcher.scan(text)
+    for label in matcher.groups:
+        if label[0] == "intent" and label in hits:
+            return label[1]
+    return "general"
+
+
+def match_forbidden(text: str) -> List[str]:
+    return list(current_matcher().scan(text).get(("safety", "forbidden"), ()))
 
 
 def node_intent_router(state: OrchestratorState) -> OrchestratorState:
     with trace_node("intent_router", state) as span:
-        text = state["prompt"].lower()
-        intent = "general"
-        if any(k in text for k in ["file", "image", "audio", "video"]):
-            intent = "multimodal_rag"
-        elif any(k in text for k in ["plan", "roadmap", "milestone"]):
-            intent = "planning"
-        elif any(k in text for k in ["compare", "verify", "fact check"]):
-            intent = "research"
+        intent = match_intent(state["prompt"])
         state["intent"] = intent
         span.set_attribute("graph.intent", intent)
         append_step(state, "intent_router", {"intent": intent})
     return state
 
 
+def split_sub_prompts(prompt: str, count: int) -> List[str]:
+    """Split a prompt into `count` contiguous parts on sentence boundaries (word boundaries as a fallback)."""
+    units = [item for item in re.split(r"(?<=[.!?])\s+", prompt.strip()) if item]
+    if len(units) < count:
+        units = prompt.split()
+    size = math.ceil(len(units) / count)
+    parts = [" ".join(units[i : i + size]) for i in range(0, len(units), size)]
+    return parts + [prompt] * (count - len(parts))
+
+
 def node_planner(state: OrchestratorState) -> OrchestratorState:
     with trace_node("planner", state) as span:
         plan = [
@@ -640,9 +2752,16 @@ def node_planner(state: OrchestratorState) -> OrchestratorState:
         budget = int(state["metadata"].get("spawn_budget", MAX_SUBAGENT_CHILDREN))
         if len(state["prompt"]) > 200 and depth < MAX_SUBAGENT_DEPTH and budget > 0:
             sub_count = min(2, budget, MAX_SUBAGENT_CHILDREN)
+            child_budget = (budget - sub_count) // sub_count
             sub_agents = [
-                {"id": f"sub_{i+1}", "role": "planner.subagent", "depth": depth + 1}
-                for i in range(sub_count)
+                {
+                    "id": f"sub_{i+1}",
+                    "role": "planner.subagent",
+                    "depth": depth + 1,
+                    "spawn_budget": child_budget,
+                    "prompt": segment,
+                }
+                for i, segment in enumerate(split_sub_prompts(state["prompt"], sub_count))
             ]
             state["sub_agents"] = sub_agents
             plan.append({"task": "spawn_sub_agents", "agent": "planner", "status": "done", "count": sub_count})
@@ -651,27 +2770,199 @@ def node_planner(state: OrchestratorState) -> OrchestratorState:
 
         state["plan"] = plan
         span.set_attribute("planner.sub_agents", len(state["sub_agents"]))
-        append_step(state, "planner", {"plan": plan, "sub_agents": state["sub_agents"]})
+        append_step(
+            state,
+            "planner",
+            {"plan": plan, "sub_agents": state["sub_agents"], "branches": planned_branches(state)},
+        )
     return state
 
 
-def node_researcher(state: OrchestratorState) -> OrchestratorState:
+def branch_update(name: str, execution: List[Dict[str, Any]], payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"branches": {name: {"execution": execution, "payload": payload}}}
+
+
+def node_researcher(state: OrchestratorState) -> Dict[str, Any]:
     with trace_node("researcher", state) as span:
         result = execute_tool_with_resilience("kb_search", {"query": state["prompt"]})
-        state["execution"].append({"phase": "researcher", **result})
         span.set_attribute("researcher.status", result.get("status", "unknown"))
-        append_step(state, "researcher", {"result": result})
-    return state
+    return branch_update("researcher", [{"phase": "researcher", **result}], {"result": result})
+
+
+async def anode_researcher(state: OrchestratorState) -> Dict[str, Any]:
+    with trace_node("researcher", state) as span:
+        result = await aexecute_tool_with_resilience("kb_search", {"query": state["prompt"]})
+        span.set_attribute("researcher.status", result.get("status", "unknown"))
+    return branch_update("researcher", [{"phase": "researcher", **result}], {"result": result})
 
 
-def node_executor(state: OrchestratorState) -> OrchestratorState:
+def executor_tool_calls(state: OrchestratorState) -> List[Tuple[str, Dict[str, Any]]]:
+    return [
+        ("web_search", {"query": state["prompt"]}),
+        ("code_exec_sandboxed", {"expression": "2+2*10"}),
+    ]
+
+
+def execute_tools_concurrently(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    if len(calls) <= 1:
+        return [execute_tool_with_resilience(name, args) for name, args in calls]
+    # Each call gets its own context copy so tool spans stay parented to the calling node.
+    futures = [
+        TOOL_POOL.submit(contextvars.copy_context().run, execute_tool_with_resilience, name, args)
+        for name, args in calls
+    ]
+    return [future.result() for future in futures]
+
+
+def node_executor(state: OrchestratorState) -> Dict[str, Any]:
+    with trace_node("executor", state):
+        tool_runs = execute_tools_concurrently(executor_tool_calls(state))
+    return branch_update("executor", [{"phase": "executor", **item} for item in tool_runs], {"execution": tool_runs})
+
+
+async def anode_executor(state: OrchestratorState) -> Dict[str, Any]:
     with trace_node("executor", state):
-        tool_runs = [
-            execute_tool_with_resilience("web_search", {"query": state["prompt"]}),
-            execute_tool_with_resilience("code_exec_sandboxed", {"expression": "2+2*10"}),
+        tool_runs = list(
+            await asyncio.gather(
+                *(aexecute_tool_with_resilience(name, args) for name, args in executor_tool_calls(state))
+            )
+        )
+    return branch_update("executor", [{"phase": "executor", **item} for item in tool_runs], {"execution": tool_runs})
+
+
+SUBAGENT_POOLS: Dict[int, ThreadPoolExecutor] = {}
+SUBAGENT_POOLS_LOCK = threading.Lock()
+
+
+def subagent_pool(depth: int) -> ThreadPoolExecutor:
+    # One pool per depth: a run only waits on children one level down, so nested runs can never
+    # exhaust the workers they are waiting on.
+    with SUBAGENT_POOLS_LOCK:
+        pool = SUBAGENT_POOLS.get(depth)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=max(1, SUBAGENT_WORKERS), thread_name_prefix=f"orchestrator-subagent-{depth}")
+            SUBAGENT_POOLS[depth] = pool
+        return pool
+
+
+def child_graph_state(state: OrchestratorState, agent: Dict[str, Any]) -> OrchestratorState:
+    metadata = {
+        **state["metadata"],
+        "depth": agent["depth"],
+        "spawn_budget": agent["spawn_budget"],
+        "parent_run_id": state["run_id"],
+        "sub_agent_id": agent["id"],
+    }
+    req = GraphRunRequest(prompt=agent["prompt"], session_id=state["session_id"], metadata=metadata)
+    child = initial_graph_state(req)
+    child["deadline_at"] = state["deadline_at"]
+    return child
+
+
+def sub_agent_result(agent: Dict[str, Any], child: Optional[OrchestratorState], error: str = "") -> Dict[str, Any]:
+    if child is None:
+        SUBAGENT_RUNS_TOTAL.labels(result="error").inc()
+        return {"phase": "sub_agent", "sub_agent_id": agent["id"], "status": "error", "error": error}
+    SUBAGENT_RUNS_TOTAL.labels(result="ok").inc()
+    return {
+        "phase": "sub_agent",
+        "sub_agent_id": agent["id"],
+        "status": "ok",
+        "run_id": child["run_id"],
+        "intent": child["intent"],
+        "decision": child["verifier_report"].get("decision", "n/a"),
+        "final_answer": child["final_answer"],
+        "step_hash": child["step_hash"],
+    }
+
+
+def sub_agents_update(results: List[Dict[str, Any]], children: List[OrchestratorState]) -> Dict[str, Any]:
+    payload = {
+        "sub_agents": [
+            {key: item.get(key) for key in ("sub_agent_id", "status", "run_id", "step_hash", "decision")}
+            for item in results
         ]
-        state["execution"].extend([{"phase": "executor", **item} for item in tool_runs])
-        append_step(state, "executor", {"execution": tool_runs})
+    }
+    update = branch_update("sub_agents", results, payload)
+    update["branches"]["sub_agents"]["child_runs"] = children
+    return update
+
+
+def run_child_graph(state: OrchestratorState) -> OrchestratorState:
+    return GRAPH.invoke(state)
+
+
+def node_sub_agents(state: OrchestratorState) -> Dict[str, Any]:
+    agents = state["sub_agents"]
+    if not agents:
+        return {}
+    with trace_node("sub_agents", state) as span:
+        span.set_attribute("sub_agents.count", len(agents))
+        pool = subagent_pool(int(state["metadata"].get("depth", 0)))
+        limit = max(1, SUBAGENT_MAX_CONCURRENCY)
+        results: List[Dict[str, Any]] = []
+        children: List[OrchestratorState] = []
+        # Submit in windows of `limit` so one run cannot monopolise the shared pool.
+        for start in range(0, len(agents), limit):
+            window = agents[start : start + limit]
+            if deadline_passed():
+                DEADLINE_MISSES_TOTAL.labels(stage="sub_agents").inc(len(agents) - start)
+                results.extend(sub_agent_result(agent, None, "deadline_exceeded") for agent in agents[start:])
+                break
+            futures = [
+                pool.submit(contextvars.copy_context().run, run_child_graph, child_graph_state(state, agent))
+                for agent in window
+            ]
+            for agent, future in zip(window, futures):
+                try:
+                    child = future.result()
+                except Exception as exc:
+                    LOGGER.exception("Sub-agent %s of run %s failed", agent["id"], state["run_id"])
+                    results.append(sub_agent_result(agent, None, str(exc)))
+                    continue
+                children.append(child)
+                results.append(sub_agent_result(agent, child))
+    return sub_agents_update(results, children)
+
+
+async def anode_sub_agents(state: OrchestratorState) -> Dict[str, Any]:
+    agents = state["sub_agents"]
+    if not agents:
+        return {}
+    with trace_node("sub_agents", state) as span:
+        span.set_attribute("sub_agents.count", len(agents))
+        semaphore = asyncio.Semaphore(max(1, SUBAGENT_MAX_CONCURRENCY))
+
+        async def run_child(agent: Dict[str, Any]) -> OrchestratorState:
+            async with semaphore:
+                if deadline_passed(state["deadline_at"]):
+                    DEADLINE_MISSES_TOTAL.labels(stage="sub_agents").inc()
+                    raise TimeoutError("deadline_exceeded")
+                return await ASYNC_GRAPH.ainvoke(child_graph_state(state, agent))
+
+        outcomes = await asyncio.gather(*(run_child(agent) for agent in agents), return_exceptions=True)
+        results: List[Dict[str, Any]] = []
+        children: List[OrchestratorState] = []
+        for agent, outcome in zip(agents, outcomes):
+            if isinstance(outcome, BaseException):
+                LOGGER.error("Sub-agent %s of run %s failed: %s", agent["id"], state["run_id"], outcome)
+                results.append(sub_agent_result(agent, None, str(outcome)))
+                continue
+            children.append(outcome)
+            results.append(sub_agent_result(agent, outcome))
+    return sub_agents_update(results, children)
+
+
+def node_join(state: OrchestratorState) -> OrchestratorState:
+    """Fold parallel branch results into execution and the step chain in a fixed order."""
+    with trace_node("join", state):
+        for name in BRANCH_ORDER:
+            branch = state["branches"].get(name)
+            if branch is None:
+                continue
+            state["execution"].extend(branch["execution"])
+            state["child_runs"].extend(branch.get("child_runs", []))
+            append_step(state, name, branch["payload"])
     return state
 
 
@@ -701,8 +2992,7 @@ def node_critic_debate(state: OrchestratorState) -> OrchestratorState:
 
 def node_safety(state: OrchestratorState) -> OrchestratorState:
     with trace_node("safety", state):
-        text = state["prompt"].lower()
-        violations = [pattern for pattern in FORBIDDEN_PATTERNS if pattern in text]
+        violations = match_forbidden(state["prompt"])
         state["safety"] = {"allowed": len(violations) == 0, "violations": violations}
         append_step(state, "safety", state["safety"])
     return state
@@ -724,39 +3014,185 @@ def node_verifier(state: OrchestratorState) -> OrchestratorState:
                 f"DebateDecision={state['debate'].get('decision', 'n/a')} "
                 f"Confidence={confidence}."
             )
+        deadline_misses = len([item for item in state["execution"] if item.get("error") == "deadline_exceeded"])
+        deadline_exceeded = deadline_misses > 0 or deadline_passed(state["deadline_at"])
+        if deadline_exceeded:
+            DEADLINE_MISSES_TOTAL.labels(stage="run").inc()
         state["verifier_report"] = {
             "decision": decision,
             "confidence": confidence,
             "policy_checks": state["safety"],
-            "requires_human_review": confidence < 0.6,
+            "requires_human_review": confidence < 0.6 or deadline_exceeded,
+            "deadline": {"exceeded": deadline_exceeded, "missed_calls": deadline_misses},
         }
         state["final_answer"] = final_answer
         append_step(state, "verifier", {"final_answer": final_answer, "report": state["verifier_report"]})
     return state
 
 
-def build_graph():
+def route_after_safety(state: OrchestratorState) -> str:
+    if not state["safety"].get("allowed", True):
+        GRAPH_ROUTES_TOTAL.labels(route="blocked").inc()
+        return "verifier"
+    return "planner"
+
+
+def planned_branches(state: OrchestratorState) -> List[str]:
+    """Branches the run needs: trivial general prompts skip retrieval and tools entirely."""
+    if deadline_passed(state["deadline_at"]):
+        return []
+    trivial = state["intent"] == "general" and len(tokenize(state["prompt"])) <= TRIVIAL_PROMPT_MAX_TOKENS
+    branches = [] if trivial else ["researcher", "executor"]
+    if state["sub_agents"]:
+        branches.append("sub_agents")
+    return branches
+
+
+def route_after_planner(state: OrchestratorState) -> List[str]:
+    branches = planned_branches(state)
+    if not branches and deadline_passed(state["deadline_at"]):
+        DEADLINE_MISSES_TOTAL.labels(stage="branches").inc()
+        GRAPH_ROUTES_TOTAL.labels(route="deadline").inc()
+        return ["join"]
+    GRAPH_ROUTES_TOTAL.labels(route="full" if branches else "trivial").inc()
+    return branches or ["join"]
+
+
+def inline_async(node: Callable[[OrchestratorState], OrchestratorState]):
+    """Wrap a CPU-only node so the async graph runs it on the event loop instead of a worker thread."""
+
+    async def run(state: OrchestratorState) -> OrchestratorState:
+        return node(state)
+
+    run.__name__ = f"a{node.__name__}"
+    return run
+
+
+def build_graph(async_nodes: bool = False, checkpointer: Any = False):
     graph = StateGraph(OrchestratorState)
-    graph.add_node("intent_router", node_intent_router)
-    graph.add_node("planner", node_planner)
-    graph.add_node("researcher", node_researcher)
-    graph.add_node("executor", node_executor)
-    graph.add_node("critic", node_critic_debate)
-    graph.add_node("safety", node_safety)
-    graph.add_node("verifier", node_verifier)
+    nodes = {
+        "intent_router": (node_intent_router, inline_async(node_intent_router)),
+        "planner": (node_planner, inline_async(node_planner)),
+        "researcher": (node_researcher, anode_researcher),
+        "executor": (node_executor, anode_executor),
+        "sub_agents": (node_sub_agents, anode_sub_agents),
+        "join": (node_join, inline_async(node_join)),
+        "critic": (node_critic_debate, inline_async(node_critic_debate)),
+        "safety": (node_safety, inline_async(node_safety)),
+        "verifier": (node_verifier, inline_async(node_verifier)),
+    }
+    for name, (sync_node, async_node) in nodes.items():
+        graph.add_node(name, async_node if async_nodes else sync_node)
 
     graph.add_edge(START, "intent_router")
-    graph.add_edge("intent_router", "planner")
-    graph.add_edge("planner", "researcher")
-    graph.add_edge("researcher", "executor")
-    graph.add_edge("executor", "critic")
-    graph.add_edge("critic", "safety")
-    graph.add_edge("safety", "verifier")
+    graph.add_edge("intent_router", "safety")
+    graph.add_conditional_edges("safety", route_after_safety, ["planner", "verifier"])
+    graph.add_conditional_edges("planner", route_after_planner, [*BRANCH_ORDER, "join"])
+    for branch in BRANCH_ORDER:
+        graph.add_edge(branch, "join")
+    graph.add_edge("join", "critic")
+    graph.add_edge("critic", "verifier")
     graph.add_edge("verifier", END)
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
 
 
+# Plain graphs for sub-agent child runs; checkpointer=False keeps them from nesting into the parent's checkpoints.
 GRAPH = build_graph()
+ASYNC_GRAPH = build_graph(async_nodes=True)
+
+MEMORY_CHECKPOINTER = InMemorySaver()
+CHECKPOINTED_GRAPHS: Dict[bool, Any] = {}
+CHECKPOINTED_GRAPHS_LOCK = threading.Lock()
+
+
+def checkpointed_graph():
+    """Top-level sync graph that checkpoints state after every superstep, keyed by run_id."""
+    graph = CHECKPOINTED_GRAPHS.get(False)
+    if graph is None:
+        with CHECKPOINTED_GRAPHS_LOCK:
+            graph = CHECKPOINTED_GRAPHS.get(False)
+            if graph is None:
+                dsn = os.getenv("DATABASE_URL", "")
+                if not dsn:
+                    checkpointer = MEMORY_CHECKPOINTER
+                else:
+                    from langgraph.checkpoint.postgres import PostgresSaver
+
+                    checkpointer = PostgresSaver(get_checkpoint_pool(dsn))
+                graph = CHECKPOINTED_GRAPHS[False] = build_graph(checkpointer=checkpointer)
+    return graph
+
+
+async def acheckpointed_graph():
+    graph = CHECKPOINTED_GRAPHS.get(True)
+    if graph is None:
+        dsn = os.getenv("DATABASE_URL", "")
+        if not dsn:
+            checkpointer = MEMORY_CHECKPOINTER
+        else:
+            from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+            checkpointer = AsyncPostgresSaver(await aget_checkpoint_pool(dsn))
+        graph = CHECKPOINTED_GRAPHS.setdefault(True, build_graph(async_nodes=True, checkpointer=checkpointer))
+    return graph
+
+
+def checkpoint_config(run_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": run_id}}
+
+
+MEMORY_CHECKPOINT_EXPIRY: "collections.OrderedDict[str, float]" = collections.OrderedDict()
+MEMORY_CHECKPOINT_LOCK = threading.Lock()
+
+
+def checkpoint_durability(graph: Any) -> str:
+    """Checkpoint after every superstep so a run killed mid-way resumes from its last completed node.
+
+    Postgres writes block the next superstep ("sync"), so a process restart never loses a completed step; the
+    in-memory saver dies with the process anyway and writes in the background ("async"). Successful runs delete
+    their thread afterwards, so checkpoints only accumulate for runs that can still be resumed.
+    """
+    return "async" if graph.checkpointer is MEMORY_CHECKPOINTER else "sync"
+
+
+def expire_memory_checkpoints() -> None:
+    """Drop in-memory checkpoints of failed runs that were not resumed within ORCH_CHECKPOINT_TTL_SECONDS."""
+    now = time.monotonic()
+    with MEMORY_CHECKPOINT_LOCK:
+        while MEMORY_CHECKPOINT_EXPIRY:
+            run_id, expires_at = next(iter(MEMORY_CHECKPOINT_EXPIRY.items()))
+            if expires_at > now:
+                return
+            del MEMORY_CHECKPOINT_EXPIRY[run_id]
+            MEMORY_CHECKPOINTER.delete_thread(run_id)
+
+
+def retain_checkpoint(graph: Any, run_id: str) -> None:
+    if graph.checkpointer is not MEMORY_CHECKPOINTER:
+        return
+    with MEMORY_CHECKPOINT_LOCK:
+        MEMORY_CHECKPOINT_EXPIRY[run_id] = time.monotonic() + CHECKPOINT_TTL_SECONDS
+        MEMORY_CHECKPOINT_EXPIRY.move_to_end(run_id)
+
+
+def release_checkpoint(graph: Any, run_id: str) -> None:
+    with MEMORY_CHECKPOINT_LOCK:
+        MEMORY_CHECKPOINT_EXPIRY.pop(run_id, None)
+    graph.checkpointer.delete_thread(run_id)
+
+
+async def arelease_checkpoint(graph: Any, run_id: str) -> None:
+    with MEMORY_CHECKPOINT_LOCK:
+        MEMORY_CHECKPOINT_EXPIRY.pop(run_id, None)
+    await graph.checkpointer.adelete_thread(run_id)
+
+
+class GraphRunError(Exception):
+    """A run failed part-way; its last completed superstep is checkpointed under run_id."""
+
+    def __init__(self, run_id: str, message: str):
+        super().__init__(message)
+        self.run_id = run_id
 
 
 @app.on_event("startup")
@@ -764,6 +3200,175 @@ def on_startup():
     init_db()
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await run_in_threadpool(PERSISTER.stop)
+    await aclose_http_client()
+    await run_in_threadpool(close_http_session)
+    await run_in_threadpool(close_embed_pool)
+    await aclose_pool()
+    close_pool()
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded FIFO wait queue for one endpoint class.
+
+    Runs on the event loop only, so no lock is needed. A released slot is handed straight to the
+    oldest waiter, which keeps queued requests from being overtaken by new arrivals.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiters: "collections.deque[asyncio.Future]" = collections.deque()
+        ADMISSION_IN_FLIGHT.labels(endpoint_class=name).set_function(lambda: self.in_flight)
+        ADMISSION_QUEUED.labels(endpoint_class=name).set_function(lambda: len(self.waiters))
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            ADMISSION_QUEUE_WAIT_SECONDS.labels(endpoint_class=self.name).observe(0.0)
+            return
+        if len(self.waiters) >= self.max_queue:
+            ADMISSION_REJECTED_TOTAL.labels(endpoint_class=self.name, reason="queue_full").inc()
+            raise AdmissionRejected(429, "queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.abandon(waiter)
+            ADMISSION_REJECTED_TOTAL.labels(endpoint_class=self.name, reason="queue_timeout").inc()
+            raise AdmissionRejected(503, "queue_timeout")
+        except BaseException:
+            self.abandon(waiter)
+            raise
+        finally:
+            ADMISSION_QUEUE_WAIT_SECONDS.labels(endpoint_class=self.name).observe(time.perf_counter() - start)
+
+    def try_acquire(self, count: int) -> int:
+        """Take up to `count` free slots without queueing; none while requests are waiting. Returns how many."""
+        if self.waiters:
+            return 0
+        taken = max(0, min(count, self.limit - self.in_flight))
+        self.in_flight += taken
+        return taken
+
+    def abandon(self, waiter: asyncio.Future) -> None:
+        with contextlib.suppress(ValueError):
+            self.waiters.remove(waiter)
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as the wait ended; pass it on.
+            self.release()
+
+    def release(self) -> None:
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "queued": len(self.waiters), "limit": self.limit, "max_queue": self.max_queue}
+
+
+ADMISSION_CONTROLLERS = {
+    endpoint_class: AdmissionController(endpoint_class, limit, max_queue, ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    for endpoint_class, (limit, max_queue) in ADMISSION_LIMITS.items()
+    if limit > 0
+}
+ADMISSION_ROUTES = (
+    ("/v1/graph/", "graph"),
+    ("/v1/knowledge/ingest", "ingest"),
+    ("/v1/knowledge/search", "search"),
+)
+
+
+def admission_controller(path: str) -> Optional[AdmissionController]:
+    for prefix, endpoint_class in ADMISSION_ROUTES:
+        if path.startswith(prefix):
+            return ADMISSION_CONTROLLERS.get(endpoint_class)
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware so a slot stays held until a streamed response body has been fully sent."""
+
+    def __init__(self, asgi_app: Any):
+        self.app = asgi_app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        controller = admission_controller(scope["path"]) if scope["type"] == "http" else None
+        if controller is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await controller.acquire()
+        except AdmissionRejected as exc:
+            response = JSONResponse(
+                status_code=exc.status_code,
+                content={"ok": False, "error": "overloaded", "reason": exc.reason, "endpoint_class": controller.name},
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Slots claimed by the endpoint through claim_admission_slots go back with the request's own.
+            for _ in range(1 + state.pop("admission_extra_slots", 0)):
+                controller.release()
+
+
+app.add_middleware(AdmissionMiddleware)
+
+
+def claim_admission_slots(request: Request, wanted: int) -> int:
+    """Extra free slots of the request's endpoint class, up to `wanted`, held until the response is sent."""
+    controller = admission_controller(request.url.path)
+    if controller is None:
+        return wanted
+    taken = controller.try_acquire(wanted)
+    request.state.admission_extra_slots = getattr(request.state, "admission_extra_slots", 0) + taken
+    return taken
+
+
+@app.exception_handler(PoolTimeout)
+def on_pool_timeout(_request: Request, exc: PoolTimeout):
+    return JSONResponse(
+        status_code=503,
+        content={"ok": False, "error": "db_pool_timeout", "message": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(GraphRunError)
+def on_graph_run_error(_request: Request, exc: GraphRunError):
+    return JSONResponse(
+        status_code=500,
+        content={
+            "ok": False,
+            "error": "graph_run_failed",
+            "message": str(exc),
+            "run_id": exc.run_id,
+            "resume": f"/v1/graph/runs/{exc.run_id}/resume",
+        },
+    )
+
+
 @app.get("/health")
 def health():
     kb_backend = "postgres" if bool(os.getenv("DATABASE_URL", "")) else "memory"
@@ -771,8 +3376,12 @@ def health():
         "status": "ok",
         "service": "orchestrator",
         "db_configured": bool(os.getenv("DATABASE_URL", "")),
+        "db_pool": pool_stats(),
+        "admission": {name: controller.stats() for name, controller in ADMISSION_CONTROLLERS.items()},
         "langgraph": "enabled",
         "knowledge_backend": kb_backend,
+        "knowledge_generation": knowledge_generation(),
+        "matcher_patterns": current_matcher().pattern_count,
     }
 
 
@@ -781,6 +3390,14 @@ def metrics():
     return PlainTextResponse(generate_latest().decode("utf-8"), media_type="text/plain; version=0.0.4")
 
 
+@app.post("/v1/matcher/reload")
+def matcher_reload():
+    if not MATCHER_PATTERNS_PATH:
+        raise HTTPException(status_code=400, detail="ORCH_MATCHER_PATTERNS_PATH is not configured")
+    reloaded = reload_matcher(force=True)
+    return {"ok": reloaded, "patterns": current_matcher().pattern_count}
+
+
 @app.post("/v1/knowledge/ingest")
 def knowledge_ingest(req: KnowledgeIngestRequest):
     document_id = req.document_id or f"doc_{uuid4()}"
@@ -794,15 +3411,47 @@ def knowledge_ingest(req: KnowledgeIngestRequest):
     return {"ok": True, **result}
 
 
+@app.post("/v1/knowledge/ingest/bulk")
+async def knowledge_ingest_bulk(request: Request):
+    results: List[Dict[str, Any]] = []
+    async for line in iter_ndjson_lines(request.stream(), BULK_INGEST_MAX_LINE_BYTES):
+        results.append(await run_in_threadpool(ingest_document, line))
+    return {
+        "ok": all(item["ok"] for item in results),
+        "documents": len(results),
+        "ingested": sum(item.get("ingested", 0) for item in results),
+        "failed": len([item for item in results if not item["ok"]]),
+        "results": results,
+    }
+
+
+@app.post("/v1/knowledge/ingest/stream")
+async def knowledge_ingest_stream(
+    request: Request,
+    document_id: Optional[str] = None,
+    chunk_size: int = Query(default=700, ge=100, le=2000),
+    chunk_overlap: int = Query(default=120, ge=0, le=500),
+    metadata: str = "{}",
+):
+    try:
+        parsed_metadata = json.loads(metadata)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"metadata must be a JSON object: {exc}") from exc
+    if not isinstance(parsed_metadata, dict):
+        raise HTTPException(status_code=400, detail="metadata must be a JSON object")
+    document_id = document_id or f"doc_{uuid4()}"
+    result = await ingest_text_stream(request.stream(), document_id, parsed_metadata, chunk_size, chunk_overlap)
+    return {"ok": True, **result}
+
+
 @app.post("/v1/knowledge/search")
 def knowledge_search(req: KnowledgeSearchRequest):
-    results = hybrid_search(req.query, req.top_k)
+    results = hybrid_search(req.query, req.top_k, probes=req.probes)
     return {"ok": True, "query": req.query, "results": results, "count": len(results)}
 
 
-@app.post("/v1/graph/run")
-def run_graph(req: GraphRunRequest):
-    initial_state: OrchestratorState = {
+def initial_graph_state(req: GraphRunRequest) -> OrchestratorState:
+    return {
         "run_id": f"run_{uuid4()}",
         "session_id": req.session_id or f"session_{uuid4()}",
         "prompt": req.prompt,
@@ -817,16 +3466,13 @@ def run_graph(req: GraphRunRequest):
         "steps": [],
         "step_hash": "genesis",
         "metadata": req.metadata,
+        "branches": {},
+        "child_runs": [],
+        "deadline_at": run_deadline_at(req.metadata),
     }
 
-    try:
-        final_state = GRAPH.invoke(initial_state)
-        persist_run(final_state)
-        GRAPH_RUNS_TOTAL.labels(result="ok").inc()
-    except Exception:
-        GRAPH_RUNS_TOTAL.labels(result="error").inc()
-        raise
 
+def graph_response(final_state: OrchestratorState) -> Dict[str, Any]:
     return {
         "ok": True,
         "run_id": final_state["run_id"],
@@ -842,3 +3488,522 @@ def run_graph(req: GraphRunRequest):
         "sub_agents": final_state["sub_agents"],
     }
 
+
+def run_checkpointed(
+    graph_input: Any,
+    run_id: str,
+    persist: Callable[[OrchestratorState], None] = persist_run,
+) -> Dict[str, Any]:
+    graph = checkpointed_graph()
+    expire_memory_checkpoints()
+    try:
+        final_state = graph.invoke(graph_input, checkpoint_config(run_id), durability=checkpoint_durability(graph))
+        persist(final_state)
+        GRAPH_RUNS_TOTAL.labels(result="ok").inc()
+    except PoolTimeout:
+        GRAPH_RUNS_TOTAL.labels(result="error").inc()
+        retain_checkpoint(graph, run_id)
+        raise
+    except Exception as exc:
+        GRAPH_RUNS_TOTAL.labels(result="error").inc()
+        retain_checkpoint(graph, run_id)
+        raise GraphRunError(run_id, str(exc)) from exc
+    # Completed runs live in graph_runs/graph_steps; checkpoints only matter while a run can be resumed.
+    release_checkpoint(graph, run_id)
+    return graph_response(final_state)
+
+
+async def arun_checkpointed(
+    graph_input: Any,
+    run_id: str,
+    persist: Callable[[OrchestratorState], Awaitable[None]] = apersist_run,
+) -> Dict[str, Any]:
+    graph = await acheckpointed_graph()
+    expire_memory_checkpoints()
+    try:
+        final_state = await graph.ainvoke(graph_input, checkpoint_config(run_id), durability=checkpoint_durability(graph))
+        await persist(final_state)
+        GRAPH_RUNS_TOTAL.labels(result="ok").inc()
+    except PoolTimeout:
+        GRAPH_RUNS_TOTAL.labels(result="error").inc()
+        retain_checkpoint(graph, run_id)
+        raise
+    except Exception as exc:
+        GRAPH_RUNS_TOTAL.labels(result="error").inc()
+        retain_checkpoint(graph, run_id)
+        raise GraphRunError(run_id, str(exc)) from exc
+    await arelease_checkpoint(graph, run_id)
+    return graph_response(final_state)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing a key onto one execution, from threads or asyncio tasks."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[str, Future] = {}
+
+    def join(self, key: str) -> Tuple[Future, bool]:
+        with self.lock:
+            future = self.calls.get(key)
+            if future is not None:
+                return future, False
+            future = self.calls[key] = Future()
+            return future, True
+
+    def finish(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self.lock:
+            self.calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """`(result, shared)`. A follower waits at most `timeout` seconds for the leader, then runs `fn` itself."""
+        future, leader = self.join(key)
+        if not leader:
+            try:
+                return future.result(None if timeout is None else max(0.0, timeout)), True
+            except FutureTimeoutError:
+                LOGGER.warning("gave up waiting for in-flight call %s; running it separately", key)
+                return fn(), False
+        try:
+            result = fn()
+        except BaseException as exc:
+            self.finish(key, future, error=exc)
+            raise
+        self.finish(key, future, result)
+        return result, False
+
+    async def ado(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        future, leader = self.join(key)
+        if not leader:
+            try:
+                # Shielded: a follower giving up must not cancel the leader's future.
+                waited = asyncio.shield(asyncio.wrap_future(future))
+                return await asyncio.wait_for(waited, None if timeout is None else max(0.0, timeout)), True
+            except asyncio.TimeoutError:
+                LOGGER.warning("gave up waiting for in-flight call %s; running it separately", key)
+                return await fn(), False
+        try:
+            result = await fn()
+        except BaseException as exc:
+            self.finish(key, future, error=exc)
+            raise
+        self.finish(key, future, result)
+        return result, False
+
+
+GRAPH_FLIGHTS = SingleFlight()
+RESULT_CACHE = LRUTTLCache("graph_results", RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SECONDS)
+
+
+def graph_run_key(req: GraphRunRequest) -> str:
+    blob = json.dumps(
+        {"prompt": req.prompt, "metadata": req.metadata, "generation": knowledge_generation()},
+        sort_keys=True,
+        ensure_ascii=True,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cached_graph_result(key: str) -> Optional[Dict[str, Any]]:
+    if RESULT_CACHE_TTL_SECONDS <= 0:
+        return None
+    return RESULT_CACHE.get(key)
+
+
+def cacheable_result(result: Dict[str, Any]) -> bool:
+    """Only clean runs are reused: a failed tool or sub-agent, an open circuit or a missed deadline is not cached."""
+    if result["verifier_report"].get("deadline", {}).get("exceeded"):
+        return False
+    return all(item.get("status") != "error" for item in [*result["execution"], *result["sub_agents"]])
+
+
+def store_graph_result(key: str, result: Dict[str, Any]) -> None:
+    if RESULT_CACHE_TTL_SECONDS > 0 and cacheable_result(result):
+        RESULT_CACHE.set(key, result)
+
+
+def deduped_response(result: Dict[str, Any], state: OrchestratorState, outcome: str) -> Dict[str, Any]:
+    """Shared results are relabelled with this request's own run and session; source_run_id names the execution."""
+    GRAPH_DEDUPE_TOTAL.labels(outcome=outcome).inc()
+    return {
+        **result,
+        "run_id": state["run_id"],
+        "session_id": state["session_id"],
+        "source_run_id": result["run_id"],
+        "dedupe": outcome,
+    }
+
+
+def alias_state(result: Dict[str, Any], state: OrchestratorState) -> OrchestratorState:
+    """Run record for a cached or coalesced request: its own run and session, the shared answer, no steps of its own.
+
+    `metadata.source_run_id` points at the execution whose steps are stored.
+    """
+    return {
+        **state,
+        "intent": result["intent"],
+        "final_answer": result["final_answer"],
+        "step_hash": result["step_hash"],
+        "metadata": {**state["metadata"], "source_run_id": result["run_id"]},
+        "steps": [],
+        "child_runs": [],
+    }
+
+
+def run_graph(req: GraphRunRequest, persist: Callable[[OrchestratorState], None] = persist_run):
+    state = initial_graph_state(req)
+    if not req.cache:
+        return deduped_response(run_checkpointed(state, state["run_id"], persist), state, "bypass")
+    key = graph_run_key(req)
+    cached = cached_graph_result(key)
+    if cached is not None:
+        persist(alias_state(cached, state))
+        return deduped_response(cached, state, "cached")
+    # A follower waits no longer than its own deadline for the leader before running the request itself.
+    result, shared = GRAPH_FLIGHTS.do(
+        key, lambda: run_checkpointed(state, state["run_id"], persist), remaining_budget(state["deadline_at"])
+    )
+    if shared:
+        persist(alias_state(result, state))
+        return deduped_response(result, state, "coalesced")
+    store_graph_result(key, result)
+    return deduped_response(result, state, "executed")
+
+
+async def arun_graph(req: GraphRunRequest, persist: Callable[[OrchestratorState], Awaitable[None]] = apersist_run):
+    state = initial_graph_state(req)
+    if not req.cache:
+        return deduped_response(await arun_checkpointed(state, state["run_id"], persist), state, "bypass")
+    if isinstance(SEARCH_CACHE, RedisSearchCache):
+        key = await asyncio.to_thread(graph_run_key, req)
+    else:
+        key = graph_run_key(req)
+    cached = cached_graph_result(key)
+    if cached is not None:
+        await persist(alias_state(cached, state))
+        return deduped_response(cached, state, "cached")
+    result, shared = await GRAPH_FLIGHTS.ado(
+        key, lambda: arun_checkpointed(state, state["run_id"], persist), remaining_budget(state["deadline_at"])
+    )
+    if shared:
+        await persist(alias_state(result, state))
+        return deduped_response(result, state, "coalesced")
+    store_graph_result(key, result)
+    return deduped_response(result, state, "executed")
+
+
+class BatchPersister:
+    """Collects run records across a batch and writes them with one COPY per PERSIST_BATCH_SIZE records."""
+
+    def __init__(self, batch_size: int):
+        self.batch_size = max(1, batch_size)
+        self.lock = threading.Lock()
+        self.records: List[PersistRecord] = []
+
+    def take(self, state: OrchestratorState) -> List[PersistRecord]:
+        with self.lock:
+            self.records.extend(run_records(state))
+            if len(self.records) < self.batch_size:
+                return []
+            records, self.records = self.records, []
+        return records
+
+    def drain(self) -> List[PersistRecord]:
+        with self.lock:
+            records, self.records = self.records, []
+        return records
+
+    def add(self, state: OrchestratorState) -> None:
+        if get_pool() is not None:
+            self.write(self.take(state))
+
+    async def aadd(self, state: OrchestratorState) -> None:
+        if os.getenv("DATABASE_URL", ""):
+            await self.awrite(self.take(state))
+
+    def flush(self) -> None:
+        if get_pool() is not None:
+            self.write(self.drain())
+
+    async def aflush(self) -> None:
+        if os.getenv("DATABASE_URL", ""):
+            await self.awrite(self.drain())
+
+    def write(self, records: List[PersistRecord]) -> None:
+        if records:
+            write_run_records(records)
+            PERSIST_RUNS_TOTAL.labels(mode="batch", result="ok").inc(len(records))
+
+    async def awrite(self, records: List[PersistRecord]) -> None:
+        if records:
+            await awrite_run_records(records)
+            PERSIST_RUNS_TOTAL.labels(mode="batch", result="ok").inc(len(records))
+
+
+def batch_error_event(index: int, exc: Exception) -> Dict[str, Any]:
+    event = {"type": "error", "index": index, "message": str(exc)}
+    if isinstance(exc, GraphRunError):
+        event["run_id"] = exc.run_id
+    return event
+
+
+def batch_summary_event(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    failed = len([event for event in events if event["type"] == "error"])
+    return {"type": "summary", "runs": len(events), "ok": len(events) - failed, "failed": failed}
+
+
+def run_batch_item(index: int, req: GraphRunRequest, persister: BatchPersister) -> Dict[str, Any]:
+    try:
+        return {"type": "result", "index": index, "result": run_graph(req, persister.add)}
+    except Exception as exc:
+        return batch_error_event(index, exc)
+
+
+def run_graph_batch(reqs: List[GraphRunRequest], concurrency: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Run many graphs, yielding one event per run as it completes and a closing summary.
+
+    KB searches for every prompt are prefetched in one batch, graphs run on a dedicated worker pool
+    and run records are written in bulk instead of one transaction per run.
+    """
+    prefetch_searches([req.prompt for req in reqs])
+    persister = BatchPersister(PERSIST_BATCH_SIZE)
+    workers = ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency or GRAPH_BATCH_CONCURRENCY, len(reqs))),
+        thread_name_prefix="graph-batch",
+    )
+    events: List[Dict[str, Any]] = []
+    try:
+        futures = [
+            workers.submit(contextvars.copy_context().run, run_batch_item, index, req, persister)
+            for index, req in enumerate(reqs)
+        ]
+        for future in as_completed(futures):
+            events.append(future.result())
+            yield events[-1]
+    finally:
+        # A disconnected client cancels queued runs; runs already executing still finish and persist.
+        workers.shutdown(wait=True, cancel_futures=True)
+        persister.flush()
+    yield batch_summary_event(events)
+
+
+async def arun_graph_batch(reqs: List[GraphRunRequest], concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    await aprefetch_searches([req.prompt for req in reqs])
+    persister = BatchPersister(PERSIST_BATCH_SIZE)
+    semaphore = asyncio.Semaphore(max(1, concurrency or GRAPH_BATCH_CONCURRENCY))
+
+    async def run_item(index: int, req: GraphRunRequest) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"type": "result", "index": index, "result": await arun_graph(req, persister.aadd)}
+            except Exception as exc:
+                return batch_error_event(index, exc)
+
+    tasks = [asyncio.create_task(run_item(index, req)) for index, req in enumerate(reqs)]
+    events: List[Dict[str, Any]] = []
+    try:
+        for next_event in asyncio.as_completed(tasks):
+            events.append(await next_event)
+            yield events[-1]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await persister.aflush()
+    yield batch_summary_event(events)
+
+
+def resume_command(deadline_ms: Optional[float]) -> Command:
+    """Resume input: the checkpointed deadline has usually lapsed, so the retry gets a fresh budget."""
+    metadata = {} if deadline_ms is None else {"deadline_ms": deadline_ms}
+    return Command(update={"deadline_at": run_deadline_at(metadata)})
+
+
+def resume_graph(run_id: str, deadline_ms: Optional[float] = None):
+    if not checkpointed_graph().get_state(checkpoint_config(run_id)).values:
+        raise HTTPException(status_code=404, detail=f"no resumable checkpoint for run: {run_id}")
+    try:
+        result = run_checkpointed(resume_command(deadline_ms), run_id)
+    except Exception:
+        GRAPH_RESUMES_TOTAL.labels(result="error").inc()
+        raise
+    GRAPH_RESUMES_TOTAL.labels(result="ok").inc()
+    return result
+
+
+async def aresume_graph(run_id: str, deadline_ms: Optional[float] = None):
+    graph = await acheckpointed_graph()
+    if not (await graph.aget_state(checkpoint_config(run_id))).values:
+        raise HTTPException(status_code=404, detail=f"no resumable checkpoint for run: {run_id}")
+    try:
+        result = await arun_checkpointed(resume_command(deadline_ms), run_id)
+    except Exception:
+        GRAPH_RESUMES_TOTAL.labels(result="error").inc()
+        raise
+    GRAPH_RESUMES_TOTAL.labels(result="ok").inc()
+    return result
+
+
+@app.post("/v1/graph/run")
+async def graph_run(req: GraphRunRequest):
+    if GRAPH_EXECUTION_MODE == "async":
+        return await arun_graph(req)
+    return await run_in_threadpool(run_graph, req)
+
+
+@app.post("/v1/graph/run_batch")
+async def graph_run_batch(req: GraphBatchRequest, request: Request):
+    wanted = max(1, min(req.concurrency or GRAPH_BATCH_CONCURRENCY, len(req.runs)))
+    # The request's own admission slot covers one run; every further concurrent run needs a free graph slot,
+    # so a batch never runs more graphs than the graph limit allows and never overtakes queued requests.
+    concurrency = 1 + claim_admission_slots(request, wanted - 1)
+    if GRAPH_EXECUTION_MODE == "async":
+        async def body() -> AsyncIterator[str]:
+            async for event in arun_graph_batch(req.runs, concurrency):
+                yield encode_event(event, "ndjson")
+
+        content: Any = body()
+    else:
+        content = (encode_event(event, "ndjson") for event in run_graph_batch(req.runs, concurrency))
+    return StreamingResponse(content, media_type="application/x-ndjson")
+
+
+@app.post("/v1/graph/runs/{run_id}/resume")
+async def graph_resume(run_id: str, deadline_ms: Optional[float] = None):
+    if GRAPH_EXECUTION_MODE == "async":
+        return await aresume_graph(run_id, deadline_ms)
+    return await run_in_threadpool(resume_graph, run_id, deadline_ms)
+
+
+STREAM_FORMATS = {
+    "sse": "text/event-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def encode_event(event: Dict[str, Any], fmt: str) -> str:
+    data = json.dumps(event, ensure_ascii=True, default=str)
+    if fmt == "ndjson":
+        return f"{data}\n"
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+def stream_start_event(state: OrchestratorState) -> Dict[str, Any]:
+    return {"type": "run", "run_id": state["run_id"], "session_id": state["session_id"]}
+
+
+def stream_chunk_events(mode: str, chunk: Dict[str, Any], emitted_steps: int) -> Tuple[List[Dict[str, Any]], int]:
+    events: List[Dict[str, Any]] = []
+    if mode == "updates":
+        for node, update in chunk.items():
+            if node not in BRANCH_ORDER:
+                continue
+            for name, branch in ((update or {}).get("branches") or {}).items():
+                events.append({"type": "branch", "node": node, "name": name, **branch})
+        return events, emitted_steps
+    steps = chunk.get("steps") or []
+    for step in steps[emitted_steps:]:
+        events.append({"type": "step", **step})
+    return events, len(steps)
+
+
+def stream_final_event(final_state: OrchestratorState) -> Dict[str, Any]:
+    response = graph_response(final_state)
+    # Steps and branch results were already streamed; only the summary is repeated.
+    for key in ("ok", "steps", "execution"):
+        response.pop(key)
+    return {"type": "final", **response}
+
+
+def stream_error_event(run_id: str, exc: Exception) -> Dict[str, Any]:
+    return {
+        "type": "error",
+        "code": "graph_run_failed",
+        "message": str(exc),
+        "run_id": run_id,
+        "resume": f"/v1/graph/runs/{run_id}/resume",
+    }
+
+
+def iter_graph_events(req: GraphRunRequest) -> Iterator[Dict[str, Any]]:
+    state = initial_graph_state(req)
+    yield stream_start_event(state)
+    final_state = state
+    emitted_steps = 0
+    graph = checkpointed_graph()
+    expire_memory_checkpoints()
+    config = checkpoint_config(state["run_id"])
+    try:
+        for mode, chunk in graph.stream(
+            state, config, stream_mode=["updates", "values"], durability=checkpoint_durability(graph)
+        ):
+            events, emitted_steps = stream_chunk_events(mode, chunk, emitted_steps)
+            yield from events
+            if mode == "values":
+                final_state = chunk
+        persist_run(final_state)
+        GRAPH_RUNS_TOTAL.labels(result="ok").inc()
+    except Exception as exc:
+        GRAPH_RUNS_TOTAL.labels(result="error").inc()
+        LOGGER.exception("graph stream failed for run %s", state["run_id"])
+        retain_checkpoint(graph, state["run_id"])
+        yield stream_error_event(state["run_id"], exc)
+        return
+    release_checkpoint(graph, state["run_id"])
+    yield stream_final_event(final_state)
+
+
+async def aiter_graph_events(req: GraphRunRequest) -> AsyncIterator[Dict[str, Any]]:
+    state = initial_graph_state(req)
+    yield stream_start_event(state)
+    final_state = state
+    emitted_steps = 0
+    graph = await acheckpointed_graph()
+    expire_memory_checkpoints()
+    config = checkpoint_config(state["run_id"])
+    try:
+        async for mode, chunk in graph.astream(
+            state, config, stream_mode=["updates", "values"], durability=checkpoint_durability(graph)
+        ):
+            events, emitted_steps = stream_chunk_events(mode, chunk, emitted_steps)
+            for event in events:
+                yield event
+            if mode == "values":
+                final_state = chunk
+        await apersist_run(final_state)
+        GRAPH_RUNS_TOTAL.labels(result="ok").inc()
+    except Exception as exc:
+        GRAPH_RUNS_TOTAL.labels(result="error").inc()
+        LOGGER.exception("graph stream failed for run %s", state["run_id"])
+        retain_checkpoint(graph, state["run_id"])
+        yield stream_error_event(state["run_id"], exc)
+        return
+    await arelease_checkpoint(graph, state["run_id"])
+    yield stream_final_event(final_state)
+
+
+@app.post("/v1/graph/stream")
+async def graph_stream(req: GraphRunRequest, format: str = "sse"):
+    fmt = format.strip().lower()
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"unsupported stream format: {format}")
+
+    if GRAPH_EXECUTION_MODE == "async":
+        async def body() -> AsyncIterator[str]:
+            async for event in aiter_graph_events(req):
+                yield encode_event(event, fmt)
+
+        content: Any = body()
+    else:
+        # Sync iterators are advanced in the threadpool by StreamingResponse.
+        content = (encode_event(event, fmt) for event in iter_graph_events(req))
+    return StreamingResponse(
+        content,
+        media_type=STREAM_FORMATS[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
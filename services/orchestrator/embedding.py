@@ -0,0 +1,59 @@
+"""Hashed bag-of-words embeddings.
+
+Embedding pool workers import only this module, so it must stay free of service state and import side effects.
+"""
+
+import functools
+import hashlib
+import math
+import os
+import re
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+EMBEDDING_DIM = 384
+EMBED_TOKEN_CACHE_SIZE = int(os.getenv("ORCH_EMBED_TOKEN_CACHE_SIZE", "65536"))
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-zA-Z0-9_]+", text.lower())
+
+
+@functools.lru_cache(maxsize=EMBED_TOKEN_CACHE_SIZE)
+def token_feature(token: str) -> Tuple[int, float, float]:
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    idx = int.from_bytes(digest[:4], "big") % EMBEDDING_DIM
+    sign = 1.0 if digest[4] % 2 == 0 else -1.0
+    magnitude = 1.0 + (digest[5] / 255.0)
+    return idx, sign, magnitude
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    matrix = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float64)
+    rows: List[int] = []
+    cols: List[int] = []
+    values: List[float] = []
+    for row, text in enumerate(texts):
+        for tok in tokenize(text):
+            idx, sign, magnitude = token_feature(tok)
+            rows.append(row)
+            cols.append(idx)
+            values.append(sign * magnitude)
+    if values:
+        # np.add.at is unbuffered and applies updates in order, matching token-by-token accumulation.
+        np.add.at(matrix, (np.asarray(rows), np.asarray(cols)), np.asarray(values))
+    for row in range(len(texts)):
+        # Summed in Python so the norm rounds exactly like the original scalar implementation.
+        norm = math.sqrt(sum(x * x for x in matrix[row].tolist()))
+        if norm != 0:
+            matrix[row] /= norm
+    return matrix
+
+
+def embed_batch_timed(texts: List[str]) -> Tuple[np.ndarray, float]:
+    """Process-pool entry point: embeddings plus the seconds spent computing them in the worker."""
+    started = time.perf_counter()
+    embeddings = embed_texts(texts)
+    return embeddings, time.perf_counter() - started
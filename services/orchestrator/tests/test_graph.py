@@ -1,11 +1,33 @@
+import asyncio
+import contextlib
+import contextvars
+import http.server
+import importlib.util
+import os
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
+
+from prometheus_client import REGISTRY
 
 import app
 
+POSTGRES_TEST_DSN = os.getenv("ORCH_TEST_DATABASE_URL", "")
+POSTGRES_CHECKPOINTER = importlib.util.find_spec("langgraph.checkpoint.postgres") is not None
+
+
+def cache_events(cache, event):
+    labels = {"cache": cache, "event": event}
+    return REGISTRY.get_sample_value("hephaestus_orchestrator_cache_events_total", labels) or 0.0
+
 
 class OrchestratorGraphTests(unittest.TestCase):
     def setUp(self):
         app.MEMORY_KNOWLEDGE.clear()
+        app.SEARCH_CACHE.clear()
+        app.TOOL_CACHE.clear()
 
     def test_graph_run_produces_steps_and_hash(self):
         req = app.GraphRunRequest(prompt="Create a project roadmap with milestones")
@@ -19,12 +41,73 @@ class OrchestratorGraphTests(unittest.TestCase):
         self.assertIn("verifier_report", result)
         self.assertIn("decision", result["verifier_report"])
 
+    def test_branches_run_concurrently_with_deterministic_step_chain(self):
+        originals = {name: app.TOOLS[name] for name in ("kb_search", "web_search", "code_exec_sandboxed")}
+
+        def slow(name):
+            def tool(_args):
+                app.time.sleep(0.2)
+                return {"tool": name, "status": "ok", "result": name}
+
+            return tool
+
+        for name in originals:
+            app.TOOLS[name] = slow(name)
+        try:
+            started = app.time.perf_counter()
+            result = app.run_graph(app.GraphRunRequest(prompt="Plan the rollout"))
+            elapsed = app.time.perf_counter() - started
+        finally:
+            app.TOOLS.update(originals)
+
+        self.assertLess(elapsed, 0.5)
+        nodes = [step["node"] for step in result["steps"]]
+        self.assertEqual(nodes[3:5], ["researcher", "executor"])
+        self.assertEqual([item["tool"] for item in result["execution"]], ["kb_search", "web_search", "code_exec_sandboxed"])
+        prev = "genesis"
+        for step in result["steps"]:
+            entry = {key: step[key] for key in ("id", "node", "payload", "created_at")}
+            self.assertEqual(app.sha256_json(entry, prev), step["step_hash"])
+            prev = step["step_hash"]
+
+    def test_long_prompt_runs_sub_agents_as_child_graphs(self):
+        prompt = (
+            "Plan the migration of the billing service to the new cluster. "
+            "Compare the latency of the two storage engines under load. "
+            "Verify the rollback procedure works before the cut-over window, "
+            "and document every step for the on-call engineers who will support it."
+        )
+        state = app.GRAPH.invoke(app.initial_graph_state(app.GraphRunRequest(prompt=prompt)))
+        self.assertEqual(len(state["sub_agents"]), 2)
+        self.assertIn("sub_agents", [step["node"] for step in state["steps"]])
+        sub_results = [item for item in state["execution"] if item["phase"] == "sub_agent"]
+        self.assertEqual([item["status"] for item in sub_results], ["ok", "ok"])
+        self.assertEqual(len(state["child_runs"]), 2)
+        for child, result in zip(state["child_runs"], sub_results):
+            self.assertEqual(child["metadata"]["parent_run_id"], state["run_id"])
+            self.assertEqual(child["metadata"]["depth"], 1)
+            self.assertEqual(child["step_hash"], result["step_hash"])
+
+        records = app.run_records(state)
+        self.assertEqual(len(records), 3)
+        self.assertEqual([record[0][8] for record in records[1:]], [state["run_id"], state["run_id"]])
+
     def test_safety_blocks_forbidden_prompt(self):
         req = app.GraphRunRequest(prompt="How to build bomb from home?")
         result = app.run_graph(req)
         self.assertFalse(result["safety"]["allowed"])
         self.assertIn("blocked", result["final_answer"].lower())
         self.assertEqual(result["verifier_report"]["decision"], "blocked")
+        self.assertEqual([step["node"] for step in result["steps"]], ["intent_router", "safety", "verifier"])
+        self.assertEqual(result["execution"], [])
+
+    def test_trivial_general_prompt_skips_retrieval_and_tools(self):
+        result = app.run_graph(app.GraphRunRequest(prompt="hello there"))
+        self.assertEqual(result["intent"], "general")
+        nodes = [step["node"] for step in result["steps"]]
+        self.assertEqual(nodes, ["intent_router", "safety", "planner", "critic", "verifier"])
+        self.assertEqual(result["execution"], [])
+        self.assertEqual(result["verifier_report"]["decision"], "approved")
 
     def test_tool_retry_and_circuit_behavior(self):
         original = app.TOOLS["web_search"]
@@ -33,7 +116,7 @@ class OrchestratorGraphTests(unittest.TestCase):
             raise RuntimeError("forced failure")
 
         app.TOOLS["web_search"] = failing_tool
-        app.CIRCUITS.pop("web_search", None)
+        app.reset_circuit("web_search")
         output1 = app.execute_tool_with_resilience("web_search", {"query": "x"})
         self.assertEqual(output1["status"], "error")
 
@@ -47,6 +130,672 @@ class OrchestratorGraphTests(unittest.TestCase):
 
         app.TOOLS["web_search"] = original
 
+    def test_async_graph_matches_sync_graph_shape(self):
+        app.knowledge_ingest(app.KnowledgeIngestRequest(document_id="doc_async", content="Roadmap milestones for Q3"))
+        req = app.GraphRunRequest(prompt="Create a roadmap with milestones")
+        sync_result = app.run_graph(req)
+        async_result = asyncio.run(app.arun_graph(req))
+        self.assertEqual([step["node"] for step in async_result["steps"]], [step["node"] for step in sync_result["steps"]])
+        self.assertEqual(async_result["final_answer"], sync_result["final_answer"])
+        researcher = [item for item in async_result["execution"] if item["phase"] == "researcher"][0]
+        self.assertEqual(researcher["status"], "ok")
+        self.assertEqual(len(researcher["chunks"]), 1)
+
+    def test_stream_events_follow_hash_chain_and_end_with_final(self):
+        req = app.GraphRunRequest(prompt="Research and calculate 2+2 then summarize")
+        events = list(app.iter_graph_events(req))
+        self.assertEqual(events[0]["type"], "run")
+        self.assertEqual(events[-1]["type"], "final")
+        steps = [event for event in events if event["type"] == "step"]
+        prev_hash = "genesis"
+        for step in steps:
+            entry = {key: step[key] for key in ("id", "node", "payload", "created_at")}
+            self.assertEqual(step["step_hash"], app.sha256_json(entry, prev_hash))
+            prev_hash = step["step_hash"]
+        self.assertEqual(events[-1]["step_hash"], prev_hash)
+        branch_index = min(i for i, event in enumerate(events) if event["type"] == "branch")
+        join_index = min(i for i, event in enumerate(events) if event.get("node") == "researcher" and event["type"] == "step")
+        self.assertLess(branch_index, join_index)
+        encoded = app.encode_event(events[-1], "sse")
+        self.assertTrue(encoded.startswith("event: final\ndata: {"))
+
+    def test_failed_run_resumes_from_checkpoint_without_rerunning_completed_nodes(self):
+        original_execute = app.execute_tools_concurrently
+        original_kb_search = app.TOOLS["kb_search"]
+        kb_calls = []
+
+        def counting_kb_search(args):
+            kb_calls.append(args)
+            return original_kb_search(args)
+
+        def failing_execute(_calls):
+            raise RuntimeError("worker restarted")
+
+        app.TOOLS["kb_search"] = counting_kb_search
+        app.execute_tools_concurrently = failing_execute
+        try:
+            with self.assertRaises(app.GraphRunError) as ctx:
+                app.run_graph(app.GraphRunRequest(prompt="Research and calculate 2+2 then summarize"))
+            app.execute_tools_concurrently = original_execute
+            result = app.resume_graph(ctx.exception.run_id)
+        finally:
+            app.execute_tools_concurrently = original_execute
+            app.TOOLS["kb_search"] = original_kb_search
+
+        self.assertEqual(len(kb_calls), 1)
+        self.assertEqual(result["run_id"], ctx.exception.run_id)
+        self.assertEqual(
+            [step["node"] for step in result["steps"]],
+            ["intent_router", "safety", "planner", "researcher", "executor", "critic", "verifier"],
+        )
+        prev_hash = "genesis"
+        for step in result["steps"]:
+            entry = {key: step[key] for key in ("id", "node", "payload", "created_at")}
+            self.assertEqual(step["step_hash"], app.sha256_json(entry, prev_hash))
+            prev_hash = step["step_hash"]
+        self.assertEqual(result["step_hash"], prev_hash)
+        with self.assertRaises(app.HTTPException):
+            app.resume_graph(ctx.exception.run_id)
+
+    @unittest.skipUnless(POSTGRES_CHECKPOINTER, "langgraph-checkpoint-postgres is not installed")
+    def test_postgres_checkpointer_gets_an_autocommit_pool(self):
+        from langgraph.checkpoint.postgres import PostgresSaver
+
+        pool_class = mock.MagicMock()
+        app.close_pool()
+        try:
+            with mock.patch.dict(os.environ, {"DATABASE_URL": "postgresql://example/db"}), mock.patch.object(
+                app, "ConnectionPool", pool_class
+            ):
+                graph = app.checkpointed_graph()
+        finally:
+            app.CHECKPOINTED_GRAPHS.pop(False, None)
+            app.CHECKPOINT_POOL = None
+        self.assertIsInstance(graph.checkpointer, PostgresSaver)
+        self.assertIs(graph.checkpointer.conn, pool_class.return_value)
+        kwargs = pool_class.call_args.kwargs["kwargs"]
+        self.assertEqual((kwargs["autocommit"], kwargs["prepare_threshold"]), (True, 0))
+        self.assertEqual(app.checkpoint_durability(graph), "sync")
+        self.assertEqual(app.checkpoint_durability(app.build_graph(checkpointer=app.MEMORY_CHECKPOINTER)), "async")
+
+    @unittest.skipUnless(POSTGRES_CHECKPOINTER and POSTGRES_TEST_DSN, "set ORCH_TEST_DATABASE_URL to run against Postgres")
+    def test_failed_run_resumes_from_postgres_checkpoint(self):
+        app.close_pool()
+        try:
+            with mock.patch.dict(os.environ, {"DATABASE_URL": POSTGRES_TEST_DSN}):
+                app.init_db()
+                with mock.patch.object(app, "execute_tools_concurrently", side_effect=RuntimeError("worker restarted")):
+                    with self.assertRaises(app.GraphRunError) as ctx:
+                        app.run_graph(app.GraphRunRequest(prompt="Research and calculate 2+2 then summarize", cache=False))
+                graph = app.checkpointed_graph()
+                self.assertIsNot(graph.checkpointer, app.MEMORY_CHECKPOINTER)
+                snapshot = graph.get_state(app.checkpoint_config(ctx.exception.run_id))
+                self.assertEqual(snapshot.next, ("executor",))
+                result = app.resume_graph(ctx.exception.run_id)
+        finally:
+            app.close_pool()
+        self.assertEqual(
+            [step["node"] for step in result["steps"]],
+            ["intent_router", "safety", "planner", "researcher", "executor", "critic", "verifier"],
+        )
+
+    def test_unresumed_memory_checkpoints_expire(self):
+        original_execute = app.execute_tools_concurrently
+
+        def failing_execute(_calls):
+            raise RuntimeError("worker restarted")
+
+        app.execute_tools_concurrently = failing_execute
+        try:
+            with mock.patch.object(app, "CHECKPOINT_TTL_SECONDS", 0):
+                with self.assertRaises(app.GraphRunError) as ctx:
+                    app.run_graph(app.GraphRunRequest(prompt="Research and calculate 2+2 then summarize", cache=False))
+        finally:
+            app.execute_tools_concurrently = original_execute
+        run_id = ctx.exception.run_id
+        self.assertIn(run_id, app.MEMORY_CHECKPOINT_EXPIRY)
+        app.expire_memory_checkpoints()
+        self.assertNotIn(run_id, app.MEMORY_CHECKPOINT_EXPIRY)
+        with self.assertRaises(app.HTTPException):
+            app.resume_graph(run_id)
+
+    def test_identical_concurrent_runs_share_one_execution(self):
+        original_run = app.run_checkpointed
+        original_join = app.GRAPH_FLIGHTS.join
+        release = threading.Event()
+        joined = []
+        executions = []
+
+        def slow_run(state, run_id, *args):
+            executions.append(run_id)
+            release.wait(5)
+            return original_run(state, run_id, *args)
+
+        def counting_join(key):
+            flight = original_join(key)
+            joined.append(flight[1])
+            if len(joined) == 3:
+                release.set()
+            return flight
+
+        req = app.GraphRunRequest(prompt="Summarize the release notes", metadata={"source": "api"})
+        results = []
+        app.run_checkpointed = slow_run
+        app.GRAPH_FLIGHTS.join = counting_join
+        try:
+            threads = [threading.Thread(target=lambda: results.append(app.run_graph(req))) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            bypass = app.run_graph(req.model_copy(update={"cache": False}))
+        finally:
+            app.run_checkpointed = original_run
+            del app.GRAPH_FLIGHTS.join
+
+        self.assertEqual(joined.count(True), 1)
+        self.assertEqual(len(executions), 2)
+        self.assertEqual(len({result["run_id"] for result in results}), 3)
+        self.assertEqual({result["source_run_id"] for result in results}, {executions[0]})
+        self.assertEqual(sorted(result["dedupe"] for result in results), ["coalesced", "coalesced", "executed"])
+        self.assertEqual(bypass["dedupe"], "bypass")
+        self.assertEqual(bypass["source_run_id"], executions[1])
+
+    def test_coalesced_follower_stops_waiting_at_its_deadline(self):
+        flights = app.SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: flights.do("key", lambda: release.wait(5) and "leader"))
+        leader.start()
+        while "key" not in flights.calls:
+            time.sleep(0.001)
+        try:
+            started = time.monotonic()
+            self.assertEqual(flights.do("key", lambda: "follower", timeout=0.05), ("follower", False))
+            self.assertLess(time.monotonic() - started, 1)
+
+            async def afollower():
+                async def own():
+                    return "async follower"
+
+                return await flights.ado("key", own, timeout=0.05)
+
+            self.assertEqual(asyncio.run(afollower()), ("async follower", False))
+        finally:
+            release.set()
+            leader.join(5)
+        self.assertEqual(flights.calls, {})
+
+    def test_degraded_results_are_not_cached(self):
+        original_ttl = app.RESULT_CACHE_TTL_SECONDS
+        app.RESULT_CACHE_TTL_SECONDS = 60
+        app.RESULT_CACHE.clear()
+        try:
+            req = app.GraphRunRequest(prompt="Research and calculate 2+2 then summarize", metadata={"deadline_ms": 0.001})
+            first = app.run_graph(req)
+            second = app.run_graph(req)
+            with mock.patch.dict(app.TOOLS, {"kb_search": mock.Mock(side_effect=RuntimeError("index offline"))}):
+                failed = app.run_graph(app.GraphRunRequest(prompt="Research and calculate 3+3 then summarize"))
+            self.assertEqual(len(app.RESULT_CACHE), 0)
+        finally:
+            app.RESULT_CACHE_TTL_SECONDS = original_ttl
+            app.RESULT_CACHE.clear()
+        self.assertTrue(first["verifier_report"]["deadline"]["exceeded"])
+        self.assertEqual((first["dedupe"], second["dedupe"]), ("executed", "executed"))
+        self.assertIn("error", [item["status"] for item in failed["execution"]])
+
+    def test_result_cache_serves_repeat_runs_until_knowledge_changes(self):
+        original_ttl = app.RESULT_CACHE_TTL_SECONDS
+        app.RESULT_CACHE_TTL_SECONDS = 60
+        app.RESULT_CACHE.clear()
+        try:
+            req = app.GraphRunRequest(prompt="Create a roadmap with milestones")
+            first = app.run_graph(req)
+            aliases = []
+            second = app.run_graph(req, persist=aliases.append)
+            app.knowledge_ingest(app.KnowledgeIngestRequest(document_id="doc_cache", content="Roadmap milestones"))
+            third = app.run_graph(req)
+        finally:
+            app.RESULT_CACHE_TTL_SECONDS = original_ttl
+            app.RESULT_CACHE.clear()
+        self.assertEqual(second["dedupe"], "cached")
+        self.assertEqual(second["source_run_id"], first["run_id"])
+        self.assertNotEqual(second["run_id"], first["run_id"])
+        self.assertEqual([alias["run_id"] for alias in aliases], [second["run_id"]])
+        self.assertEqual(aliases[0]["session_id"], second["session_id"])
+        self.assertEqual(aliases[0]["metadata"]["source_run_id"], first["run_id"])
+        self.assertEqual((aliases[0]["steps"], aliases[0]["final_answer"]), ([], first["final_answer"]))
+        self.assertEqual(third["dedupe"], "executed")
+
+    def test_batch_run_prefetches_searches_and_reports_each_run(self):
+        app.knowledge_ingest(app.KnowledgeIngestRequest(document_id="doc_batch", content="Roadmap milestones for Q3"))
+        prompts = ["Create a roadmap with milestones", "Research and calculate 2+2 then summarize", "hi"]
+        hits_before = cache_events("search", "hit")
+        misses_before = cache_events("search", "miss")
+        events = list(app.run_graph_batch([app.GraphRunRequest(prompt=prompt) for prompt in prompts], concurrency=2))
+        results = [event for event in events if event["type"] == "result"]
+        self.assertEqual(sorted(event["index"] for event in results), [0, 1, 2])
+        self.assertEqual(events[-1], {"type": "summary", "runs": 3, "ok": 3, "failed": 0})
+        self.assertEqual(len({event["result"]["run_id"] for event in results}), 3)
+        researcher_runs = sum(
+            1 for event in results for step in event["result"]["steps"] if step["node"] == "researcher"
+        )
+        self.assertGreater(researcher_runs, 0)
+        self.assertEqual(cache_events("search", "hit") - hits_before, researcher_runs)
+        self.assertEqual(cache_events("search", "miss") - misses_before, len(prompts))
+
+    def test_admission_controller_queues_then_sheds_load(self):
+        async def scenario():
+            controller = app.AdmissionController("test", limit=1, max_queue=1, queue_timeout=0.05)
+            await controller.acquire()
+            waiting = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            with self.assertRaises(app.AdmissionRejected) as full:
+                await controller.acquire()
+            controller.release()
+            await waiting
+            self.assertEqual(controller.stats()["in_flight"], 1)
+            timed_out = asyncio.create_task(controller.acquire())
+            with self.assertRaises(app.AdmissionRejected) as timeout:
+                await timed_out
+            controller.release()
+            return full.exception, timeout.exception, controller.stats()
+
+        full, timeout, stats = asyncio.run(scenario())
+        self.assertEqual((full.status_code, full.reason), (429, "queue_full"))
+        self.assertEqual((timeout.status_code, timeout.reason), (503, "queue_timeout"))
+        self.assertEqual((stats["in_flight"], stats["queued"]), (0, 0))
+
+    def test_admission_middleware_rejects_with_status_and_retry_after(self):
+        from fastapi.testclient import TestClient
+
+        client = TestClient(app.app)
+        for max_queue, status, reason in ((0, 429, "queue_full"), (1, 503, "queue_timeout")):
+            controller = app.AdmissionController("graph", limit=1, max_queue=max_queue, queue_timeout=0.01)
+            controller.in_flight = 1
+            with mock.patch.dict(app.ADMISSION_CONTROLLERS, {"graph": controller}):
+                response = client.post("/v1/graph/run", json={"prompt": "plan it"})
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(response.headers["retry-after"], str(app.ADMISSION_RETRY_AFTER_SECONDS))
+            self.assertEqual(response.json()["reason"], reason)
+            self.assertEqual(controller.in_flight, 1)
+
+    def test_batch_concurrency_counts_against_graph_admission(self):
+        from fastapi.testclient import TestClient
+
+        controller = app.AdmissionController("graph", limit=3, max_queue=1, queue_timeout=0.05)
+        controller.in_flight = 1
+        seen = []
+
+        def fake_batch(reqs, concurrency=None):
+            seen.append((concurrency, controller.in_flight))
+            yield {"type": "summary", "runs": len(reqs), "ok": len(reqs), "failed": 0}
+
+        with mock.patch.dict(app.ADMISSION_CONTROLLERS, {"graph": controller}), mock.patch.object(
+            app, "run_graph_batch", fake_batch
+        ):
+            response = TestClient(app.app).post(
+                "/v1/graph/run_batch", json={"runs": [{"prompt": f"plan {i}"} for i in range(5)], "concurrency": 8}
+            )
+        self.assertEqual(response.status_code, 200)
+        # One slot was already taken elsewhere: the batch gets its own slot plus the one still free.
+        self.assertEqual(seen, [(2, 3)])
+        self.assertEqual(controller.in_flight, 1)
+
+    def test_expired_deadline_skips_branches_and_is_reported(self):
+        result = app.run_graph(
+            app.GraphRunRequest(prompt="Research and calculate 2+2 then summarize", metadata={"deadline_ms": 0.001})
+        )
+        self.assertEqual(
+            [step["node"] for step in result["steps"]],
+            ["intent_router", "safety", "planner", "critic", "verifier"],
+        )
+        self.assertEqual(result["verifier_report"]["deadline"]["exceeded"], True)
+        self.assertTrue(result["verifier_report"]["requires_human_review"])
+
+    def test_tool_retries_stop_when_budget_cannot_cover_backoff(self):
+        original = app.TOOLS["web_search"]
+        calls = []
+
+        def failing_tool(args):
+            calls.append(args)
+            raise RuntimeError("upstream down")
+
+        def run_with_budget():
+            app.RUN_DEADLINE.set(time.time() + 0.1)
+            return app.execute_tool_with_resilience("web_search", {"query": "x"})
+
+        app.TOOLS["web_search"] = failing_tool
+        app.reset_circuit("web_search")
+        try:
+            with mock.patch.object(app.random, "uniform", side_effect=lambda low, high: high):
+                output = contextvars.copy_context().run(run_with_budget)
+        finally:
+            app.TOOLS["web_search"] = original
+            app.reset_circuit("web_search")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(output["error"], "deadline_exceeded")
+        self.assertEqual(output["last_error"], "upstream down")
+
+    def test_circuit_half_open_admits_limited_probes(self):
+        circuit = app.CircuitBreaker()
+        for _ in range(app.CIRCUIT_FAIL_THRESHOLD):
+            circuit.on_failure(100.0)
+        self.assertEqual(circuit.state, "open")
+        self.assertFalse(circuit.admit(100.0 + app.CIRCUIT_RESET_SECONDS - 1))
+
+        probe_at = 100.0 + app.CIRCUIT_RESET_SECONDS
+        admitted = [circuit.admit(probe_at) for _ in range(app.CIRCUIT_HALF_OPEN_PROBES + 2)]
+        self.assertEqual(circuit.state, "half_open")
+        self.assertEqual(sum(admitted), app.CIRCUIT_HALF_OPEN_PROBES)
+
+        circuit.on_failure(probe_at)
+        self.assertEqual(circuit.state, "open")
+        self.assertFalse(circuit.admit(probe_at + 1))
+
+        self.assertTrue(circuit.admit(probe_at + app.CIRCUIT_RESET_SECONDS))
+        circuit.on_success()
+        self.assertEqual(circuit.state, "closed")
+        self.assertTrue(circuit.admit(probe_at + app.CIRCUIT_RESET_SECONDS))
+
+    def test_half_open_probe_is_not_retried(self):
+        original = app.TOOLS["web_search"]
+        calls = []
+
+        def failing_tool(args):
+            calls.append(args)
+            raise RuntimeError("still down")
+
+        def cooled_down(circuit):
+            circuit.state, circuit.fail_count, circuit.probes = "open", app.CIRCUIT_FAIL_THRESHOLD, 0
+            circuit.opened_at = time.time() - app.CIRCUIT_RESET_SECONDS - 1
+
+        app.TOOLS["web_search"] = failing_tool
+        try:
+            for execute in (
+                lambda: app.execute_tool_with_resilience("web_search", {"query": "x"}),
+                lambda: asyncio.run(app.aexecute_tool_with_resilience("web_search", {"query": "x"})),
+            ):
+                calls.clear()
+                app.CIRCUIT_STORE.transact("web_search", cooled_down)
+                probe = execute()
+                rejected = execute()
+                self.assertEqual(len(calls), app.CIRCUIT_HALF_OPEN_PROBES)
+                self.assertEqual((probe["error"], probe["attempt"], rejected["error"]), ("still down", 1, "circuit_open"))
+        finally:
+            app.TOOLS["web_search"] = original
+            app.reset_circuit("web_search")
+
+    def test_shared_memory_circuits_are_visible_across_stores(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "circuits")
+            worker_a = app.SharedMemoryCircuitStore(path, slots=4)
+            worker_b = app.SharedMemoryCircuitStore(path, slots=4)
+            for _ in range(app.CIRCUIT_FAIL_THRESHOLD):
+                worker_a.transact("web_search", lambda circuit: circuit.on_failure(time.time()))
+
+            self.assertFalse(worker_b.transact("web_search", lambda circuit: circuit.admit(time.time())))
+            self.assertTrue(worker_b.transact("http_fetch", lambda circuit: circuit.admit(time.time())))
+            worker_b.reset("web_search")
+            self.assertTrue(worker_a.transact("web_search", lambda circuit: circuit.admit(time.time())))
+
+    def test_shared_memory_circuit_lock_excludes_forked_workers(self):
+        import fcntl
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = app.SharedMemoryCircuitStore(os.path.join(tmp, "circuits"), slots=4)
+            locked_r, locked_w = os.pipe()
+            done_r, done_w = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    with store.locked():
+                        os.write(locked_w, b"1")
+                        os.read(done_r, 1)
+                finally:
+                    os._exit(0)
+            try:
+                os.read(locked_r, 1)
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(store.process_fd(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            finally:
+                os.write(done_w, b"1")
+                os.waitpid(pid, 0)
+                for fd in (locked_r, locked_w, done_r, done_w):
+                    os.close(fd)
+            self.assertTrue(store.transact("web_search", lambda circuit: circuit.admit(time.time())))
+
+    def test_postgres_circuit_store_only_touches_the_database_on_changes(self):
+        rows = {}
+        checkouts = []
+
+        class FakeCursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params):
+                self.sql = " ".join(sql.split())
+                checkouts[-1].append(self.sql.split()[0])
+                if self.sql.startswith("UPDATE"):
+                    rows[params[-1]] = tuple(params[:-1])
+                elif self.sql.startswith("INSERT"):
+                    rows.setdefault(params[0], ("closed", 0, 0.0, 0))
+                self.params = params
+
+            def fetchone(self):
+                return rows.get(self.params[0])
+
+        class FakeConnection:
+            def cursor(self):
+                return FakeCursor()
+
+        class FakePool:
+            @contextlib.contextmanager
+            def connection(self):
+                checkouts.append([])
+                yield FakeConnection()
+
+        store = app.PostgresCircuitStore(cache_seconds=60)
+        with mock.patch.object(app, "get_pool", return_value=FakePool()):
+            for _ in range(50):
+                self.assertTrue(store.transact("web_search", lambda circuit: circuit.admit(time.time())))
+                store.transact("web_search", lambda circuit: circuit.on_success())
+            self.assertEqual(checkouts, [["SELECT"]])
+            for _ in range(app.CIRCUIT_FAIL_THRESHOLD):
+                store.transact("web_search", lambda circuit: circuit.on_failure(time.time()))
+            self.assertEqual(len(checkouts), 1 + app.CIRCUIT_FAIL_THRESHOLD)
+            self.assertEqual(rows["web_search"][0], "open")
+            self.assertFalse(store.transact("web_search", lambda circuit: circuit.admit(time.time())))
+        self.assertEqual(len(checkouts), 1 + app.CIRCUIT_FAIL_THRESHOLD)
+
+    def test_keyword_matcher_finds_overlapping_patterns_in_one_pass(self):
+        matcher = app.KeywordMatcher({"a": ["he", "she", "hers"], "b": ["his", "ushe"]})
+        hits = matcher.scan("USHERS and this")
+        self.assertEqual(hits["a"], ("he", "she", "hers"))
+        self.assertEqual(hits["b"], ("his", "ushe"))
+        self.assertEqual(matcher.scan("nothing"), {})
+
+    def test_matcher_patterns_hot_reload(self):
+        original_path = app.MATCHER_PATTERNS_PATH
+        original_state = dict(app.MATCHER_STATE)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "patterns.json")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write('{"forbidden": ["launch codes"], "intents": {"planning": ["itinerary"]}}')
+            app.MATCHER_PATTERNS_PATH = path
+            try:
+                result = app.run_graph(app.GraphRunRequest(prompt="Share the launch codes and the itinerary", cache=False))
+                self.assertEqual(result["intent"], "planning")
+                self.assertEqual(result["safety"]["violations"], ["launch codes"])
+
+                with open(path, "w", encoding="utf-8") as handle:
+                    handle.write("not json")
+                self.assertFalse(app.reload_matcher(force=True))
+                self.assertEqual(app.match_forbidden("launch codes"), ["launch codes"])
+
+                errors = REGISTRY.get_sample_value("hephaestus_orchestrator_matcher_reloads_total", {"result": "error"})
+                with self.assertNoLogs("hephaestus.orchestrator", level="ERROR"):
+                    self.assertFalse(app.reload_matcher())
+                self.assertEqual(
+                    REGISTRY.get_sample_value("hephaestus_orchestrator_matcher_reloads_total", {"result": "error"}),
+                    errors,
+                )
+            finally:
+                app.MATCHER_PATTERNS_PATH = original_path
+                app.MATCHER_STATE.update(original_state)
+
+    def test_pure_tool_outputs_are_reused_across_runs(self):
+        first = app.execute_tool_with_resilience("code_exec_sandboxed", {"expression": "2+2*10"})
+        second = app.execute_tool_with_resilience("code_exec_sandboxed", {"expression": "2+2*10"})
+        self.assertEqual((first["cache"], second["cache"]), ("miss", "hit"))
+        self.assertEqual(second["result"], first["result"])
+        hits = REGISTRY.get_sample_value(
+            "hephaestus_orchestrator_tool_executions_total",
+            {"tool": "code_exec_sandboxed", "status": "ok", "cache": "hit"},
+        )
+        self.assertGreaterEqual(hits, 1.0)
+
+    def test_http_fetch_revalidates_with_validators(self):
+        class FakeResponse:
+            def __init__(self, status_code, headers, body=b""):
+                self.status_code = status_code
+                self.headers = headers
+                self.body = body
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def iter_content(self, chunk_size):
+                return iter([self.body] if self.body else [])
+
+        class FakeSession:
+            def __init__(self):
+                self.sent_headers = []
+
+            def get(self, url, headers=None, timeout=None, stream=False):
+                self.sent_headers.append(headers or {})
+                if url.endswith("/down"):
+                    return FakeResponse(503, {}, b"unavailable")
+                if headers and headers.get("If-None-Match") == '"v1"':
+                    return FakeResponse(304, {"ETag": '"v1"'})
+                return FakeResponse(200, {"ETag": '"v1"'}, b"hello")
+
+        session = FakeSession()
+        original_session = app.get_http_session
+        original_policy = app.TOOL_CACHE_POLICIES["http_fetch"]
+        app.get_http_session = lambda: session
+        app.TOOL_CACHE_POLICIES["http_fetch"] = app.ToolCachePolicy("http_validator", ttl=0.0)
+        try:
+            first = app.execute_tool_with_resilience("http_fetch", {"url": "https://example.com/data"})
+            second = app.execute_tool_with_resilience("http_fetch", {"url": "https://example.com/data"})
+            app.TOOL_CACHE_POLICIES["http_fetch"] = app.ToolCachePolicy("http_validator", ttl=60.0)
+            errors = [app.execute_tool_with_resilience("http_fetch", {"url": "https://example.com/down"}) for _ in range(2)]
+        finally:
+            app.get_http_session = original_session
+            app.TOOL_CACHE_POLICIES["http_fetch"] = original_policy
+        self.assertEqual((first["cache"], second["cache"]), ("miss", "revalidated"))
+        self.assertEqual(second["length"], 5)
+        self.assertEqual(session.sent_headers[1], {"If-None-Match": '"v1"'})
+        self.assertEqual([(item["http_status"], item["cache"]) for item in errors], [(503, "miss"), (503, "miss")])
+        self.assertEqual(len(session.sent_headers), 4)
+
+    def test_http_fetch_waits_for_a_host_slot_only_within_the_budget(self):
+        url = "https://busy.example.com/data"
+
+        def fetch():
+            app.RUN_DEADLINE.set(time.time() + 0.2)
+            return app.tool_http_fetch({"url": url})
+
+        session = mock.Mock()
+        with app.HTTP_HOST_LIMITS.hold(url) as limit:
+            held = 0
+            while limit.acquire(blocking=False):
+                held += 1
+            started = time.monotonic()
+            try:
+                with mock.patch.object(app, "get_http_session", return_value=session):
+                    with self.assertRaises(TimeoutError):
+                        contextvars.copy_context().run(fetch)
+            finally:
+                for _ in range(held):
+                    limit.release()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(held, app.HTTP_MAX_CONNECTIONS_PER_HOST)
+        session.get.assert_not_called()
+
+    def test_host_limits_forget_idle_hosts_beyond_the_bound(self):
+        limits = app.HostLimits(threading.Semaphore, max_hosts=2)
+        with limits.hold("https://pinned.example.com/") as pinned:
+            for i in range(5):
+                with limits.hold(f"https://host{i}.example.com/"):
+                    pass
+            self.assertLessEqual(len(limits), 3)
+            with limits.hold("https://pinned.example.com/x") as again:
+                self.assertIs(again, pinned)
+        self.assertEqual(list(limits.entries), ["host4.example.com", "pinned.example.com"])
+
+    def test_http_fetch_streams_bodies_up_to_the_size_limit(self):
+        body = b"x" * 4096
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                if self.path == "/chunked":
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for _ in range(4):
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(body), body))
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        original_limit = app.HTTP_FETCH_MAX_BYTES
+        app.HTTP_FETCH_MAX_BYTES = 6000
+        try:
+            small = app.tool_http_fetch({"url": f"{base}/small"})
+            streamed = app.tool_http_fetch({"url": f"{base}/chunked"})
+            app.HTTP_FETCH_MAX_BYTES = 1000
+            declared = app.tool_http_fetch({"url": f"{base}/small"})
+        finally:
+            app.HTTP_FETCH_MAX_BYTES = original_limit
+            server.shutdown()
+            server.server_close()
+            app.close_http_session()
+        self.assertEqual((small["length"], small["truncated"]), (4096, False))
+        self.assertEqual((streamed["length"], streamed["truncated"]), (6000, True))
+        self.assertEqual((declared["length"], declared["truncated"]), (1000, True))
+
+    def test_async_tool_execution_uses_overrides_and_circuit(self):
+        original = app.TOOLS["web_search"]
+
+        def failing_tool(_args):
+            raise RuntimeError("forced failure")
+
+        app.TOOLS["web_search"] = failing_tool
+        app.reset_circuit("web_search")
+        try:
+            outputs = [asyncio.run(app.aexecute_tool_with_resilience("web_search", {"query": "y"})) for _ in range(3)]
+        finally:
+            app.TOOLS["web_search"] = original
+            app.reset_circuit("web_search")
+        self.assertEqual(outputs[0]["error"], "forced failure")
+        self.assertEqual(outputs[2]["error"], "circuit_open")
+
     def test_memory_ingest_and_hybrid_search(self):
         ingest = app.knowledge_ingest(
             app.KnowledgeIngestRequest(
@@ -60,10 +809,319 @@ class OrchestratorGraphTests(unittest.TestCase):
         self.assertTrue(ingest["ok"])
         self.assertGreaterEqual(ingest["ingested"], 1)
 
-        search = app.knowledge_search(app.KnowledgeSearchRequest(query="LangGraph workflow", top_k=3))
+        search = app.knowledge_search(app.KnowledgeSearchRequest(query="LangGraph workflow", top_k=3, probes=8))
         self.assertTrue(search["ok"])
         self.assertGreaterEqual(search["count"], 1)
         self.assertIn("LangGraph", search["results"][0]["content"])
+        self.assertIn("hybrid_score", search["results"][0])
+
+    def test_reingest_only_rewrites_changed_chunks(self):
+        def ingest(content):
+            return app.ingest_document_chunks(
+                content=content, document_id="doc_sync", metadata={}, chunk_size=100, chunk_overlap=0
+            )
+
+        first_words = " ".join(f"alpha{i}" for i in range(250))
+        first = ingest(first_words)
+        self.assertEqual((first["added"], first["unchanged"], first["removed"]), (3, 0, 0))
+        original_ids = {item["chunk_index"]: item["id"] for item in app.MEMORY_KNOWLEDGE}
+
+        again = ingest(first_words)
+        self.assertEqual((again["ingested"], again["unchanged"]), (0, 3))
+        self.assertEqual(len(app.MEMORY_KNOWLEDGE), 3)
+
+        edited = " ".join(f"alpha{i}" for i in range(100)) + " " + " ".join(f"beta{i}" for i in range(50))
+        result = ingest(edited)
+        self.assertEqual(
+            (result["added"], result["updated"], result["unchanged"], result["removed"]),
+            (0, 1, 1, 1),
+        )
+        current = {item["chunk_index"]: item for item in app.MEMORY_KNOWLEDGE}
+        self.assertEqual(sorted(current), [0, 1])
+        self.assertEqual(current[0]["id"], original_ids[0])
+        self.assertTrue(current[1]["content"].startswith("beta0"))
+        hits = app.MEMORY_KNOWLEDGE.keyword_search("alpha150", top_k=5)
+        self.assertEqual(hits, [])
+
+    def test_streaming_chunker_matches_whole_text_chunking(self):
+        text = "  ".join(f"word{i}" for i in range(430)) + "\n"
+        expected = app.split_chunks(text, 100, 30)
+        self.assertEqual(len(expected), 6)
+        for piece_size in (1, 7, 4096):
+            pieces = app.iter_text_pieces(text, piece_size)
+            self.assertEqual(list(app.iter_chunks(app.iter_words(pieces), 100, 30)), expected)
+
+    def test_streamed_body_is_ingested_incrementally(self):
+        async def body():
+            for i in range(300):
+                yield f"gamma{i} ".encode("utf-8")
+
+        async def invalid():
+            yield b"delta \xff"
+
+        result = asyncio.run(app.ingest_text_stream(body(), "doc_stream", {"source": "upload"}, 100, 0))
+        self.assertEqual((result["added"], result["backend"]), (3, "memory"))
+        self.assertTrue(all(item["metadata"] == {"source": "upload"} for item in app.MEMORY_KNOWLEDGE))
+        with self.assertRaises(app.HTTPException) as ctx:
+            asyncio.run(app.ingest_text_stream(invalid(), "doc_invalid", {}, 100, 0))
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(len(app.MEMORY_KNOWLEDGE), 3)
+
+    def test_failed_memory_ingest_bumps_generation_for_written_chunks(self):
+        def pieces():
+            for i in range(app.EMBED_BATCH_SIZE * 60):
+                yield f"epsilon{i} "
+            raise RuntimeError("upload interrupted")
+
+        generation = app.knowledge_generation()
+        with self.assertRaises(RuntimeError):
+            app.ingest_document_chunks(pieces(), "doc_partial", {}, 10, 0)
+        self.assertGreater(len(app.MEMORY_KNOWLEDGE), 0)
+        self.assertGreater(app.knowledge_generation(), generation)
+
+    def test_large_ingests_shard_embedding_batches_in_order(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(2)
+        submitted = []
+        original_submit = pool.submit
+
+        def submit(fn, texts):
+            submitted.append(texts[0])
+            return original_submit(fn, texts)
+
+        pool.submit = submit
+        batches = [[(i, f"chunk number {i}", "")] for i in range(6)]
+        with mock.patch.object(app, "get_embed_pool", return_value=pool), mock.patch.multiple(
+            app, EMBED_PROCESSES=2, EMBED_PROCESS_MIN_CHUNKS=2
+        ):
+            results = list(app.embed_batches(batches))
+        pool.shutdown()
+        self.assertEqual([batch[0][0] for batch, _ in results], list(range(6)))
+        self.assertEqual(submitted, [f"chunk number {i}" for i in range(2, 6)])
+        for batch, embeddings in results:
+            self.assertTrue((embeddings == app.embed_texts([batch[0][1]])).all())
+
+    def test_embed_pool_defaults_to_usable_cpus(self):
+        self.assertEqual(app.embed_batch_timed.__module__, "embedding")
+        with mock.patch.object(app.os, "sched_getaffinity", return_value=set(range(8)), create=True):
+            with mock.patch("builtins.open", mock.mock_open(read_data="200000 100000\n")):
+                self.assertEqual(app.usable_cpu_count(), 2)
+            with mock.patch("builtins.open", mock.mock_open(read_data="max 100000\n")):
+                self.assertEqual(app.usable_cpu_count(), 8)
+            with mock.patch("builtins.open", side_effect=FileNotFoundError):
+                self.assertEqual(app.usable_cpu_count(), 8)
+
+    def test_postgres_ingest_copies_only_changed_chunks(self):
+        class FakeCopy:
+            def __init__(self, rows):
+                self.rows = rows
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def write_row(self, row):
+                self.rows.append(row)
+
+        class FakeCursor:
+            def __init__(self, existing):
+                self.existing = existing
+                self.statements = []
+                self.rows = []
+                self.rowcount = 0
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                self.statements.append(" ".join(sql.split()))
+                self.rowcount = 2 if sql.lstrip().startswith("DELETE") else 0
+
+            def fetchall(self):
+                return list(self.existing.items())
+
+            def copy(self, sql):
+                return FakeCopy(self.rows)
+
+        class FakeConnection:
+            def __init__(self, cursor):
+                self.cur = cursor
+
+            def cursor(self):
+                return self.cur
+
+        class FakePool:
+            def __init__(self, cursor):
+                self.conn = FakeConnection(cursor)
+                self.checked_out = 0
+
+            @contextlib.contextmanager
+            def connection(self):
+                self.checked_out += 1
+                try:
+                    yield self.conn
+                finally:
+                    self.checked_out -= 1
+
+        content = " ".join(f"alpha{i}" for i in range(250))
+        chunks = app.split_chunks(content, 100, 0)
+        cursor = FakeCursor({0: app.chunk_content_hash(chunks[0], {}), 1: "stale"})
+        pool = FakePool(cursor)
+        held_during_upload = []
+
+        def upload():
+            for piece in app.iter_text_pieces(content, 16):
+                held_during_upload.append(pool.checked_out)
+                yield piece
+
+        generation = app.knowledge_generation()
+        with mock.patch.object(app, "get_pool", return_value=pool):
+            result = app.ingest_document_chunks(
+                content=upload(), document_id="doc_pg", metadata={}, chunk_size=100, chunk_overlap=0
+            )
+        self.assertEqual(set(held_during_upload), {0})
+        self.assertEqual(
+            (result["backend"], result["added"], result["updated"], result["unchanged"], result["removed"]),
+            ("postgres", 1, 1, 1, 2),
+        )
+        self.assertEqual([row[2] for row in cursor.rows], [1, 2])
+        self.assertTrue(any(sql.startswith("INSERT INTO knowledge_chunks") for sql in cursor.statements))
+        self.assertGreater(app.knowledge_generation(), generation)
+
+    def test_redis_cache_outage_degrades_to_misses(self):
+        class DownClient:
+            def __getattr__(self, name):
+                def fail(*args, **kwargs):
+                    raise ConnectionError("redis unreachable")
+
+                return fail
+
+        cache = app.RedisSearchCache.__new__(app.RedisSearchCache)
+        cache.client, cache.errors, cache.ttl = DownClient(), ConnectionError, None
+        with self.assertLogs("hephaestus.orchestrator", level="WARNING"):
+            cache.set("key", [{"id": "chunk"}])
+            self.assertIsNone(cache.get("key"))
+            self.assertNotEqual(cache.generation(), cache.generation())
+            cache.clear()
+
+    def test_bulk_ingest_reports_per_document_results(self):
+        documents = [
+            {"document_id": "doc_a", "content": "Alpha release notes for the orchestrator", "chunk_size": 100},
+            '{"document_id": "doc_b", "content": "Beta rollout checklist", "metadata": {"team": "ops"}}',
+            {"document_id": "doc_bad", "content": ""},
+        ]
+        results = list(app.ingest_documents(documents))
+        self.assertEqual([item["ok"] for item in results], [True, True, False])
+        self.assertEqual(results[1]["document_id"], "doc_b")
+        self.assertEqual(results[2]["error"], "invalid_document")
+        self.assertEqual(len(app.MEMORY_KNOWLEDGE), 2)
+
+    def test_ndjson_lines_are_split_across_stream_pieces(self):
+        async def stream():
+            for piece in [b'{"a": 1}\n{"b"', b': 2}\n\n', b'{"c": 3}']:
+                yield piece
+
+        async def collect():
+            return [line async for line in app.iter_ndjson_lines(stream(), max_line_bytes=1024)]
+
+        self.assertEqual(asyncio.run(collect()), [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}'])
+
+    def test_long_ndjson_line_is_joined_once(self):
+        document = b'{"content": "' + b"x" * (4 * 1024 * 1024) + b'"}'
+
+        async def stream():
+            for offset in range(0, len(document), 1024):
+                yield document[offset : offset + 1024]
+            yield b"\n"
+
+        async def collect(max_line_bytes):
+            return [line async for line in app.iter_ndjson_lines(stream(), max_line_bytes=max_line_bytes)]
+
+        self.assertEqual(asyncio.run(collect(len(document))), [document])
+        with self.assertRaises(app.HTTPException) as ctx:
+            asyncio.run(collect(len(document) - 1))
+        self.assertEqual(ctx.exception.status_code, 413)
+
+    def test_batch_embedding_matches_scalar_reference(self):
+        def reference(text):
+            vec = [0.0] * app.EMBEDDING_DIM
+            tokens = app.tokenize(text)
+            for tok in tokens:
+                digest = app.hashlib.sha256(tok.encode("utf-8")).digest()
+                idx = int.from_bytes(digest[:4], "big") % app.EMBEDDING_DIM
+                sign = 1.0 if digest[4] % 2 == 0 else -1.0
+                vec[idx] += sign * (1.0 + (digest[5] / 255.0))
+            norm = app.math.sqrt(sum(x * x for x in vec))
+            return vec if norm == 0 else [x / norm for x in vec]
+
+        texts = ["", "repeat repeat repeat", "Mixed CASE tokens, with punctuation!", " ".join(f"w{i % 97}" for i in range(2000))]
+        matrix = app.embed_texts(texts)
+        for row, text in enumerate(texts):
+            self.assertEqual(matrix[row].tolist(), reference(text))
+            self.assertEqual(app.embed_text(text), reference(text))
+        self.assertGreater(app.token_feature.cache_info().hits, 0)
+
+    def test_search_cache_hits_until_knowledge_generation_bumps(self):
+        app.ingest_document_chunks("cache warm content about pools", "doc_cache", {}, 100, 0)
+        first = app.hybrid_search("Cache   warm", top_k=3)
+        hits_before = cache_events("search", "hit")
+        self.assertEqual(app.hybrid_search("cache warm", top_k=3), first)
+        self.assertEqual(cache_events("search", "hit"), hits_before + 1)
+
+        generation = app.knowledge_generation()
+        app.ingest_document_chunks("cache warm content about pools", "doc_cache", {}, 100, 0)
+        self.assertEqual(app.knowledge_generation(), generation)
+        app.ingest_document_chunks("cache warm second document", "doc_cache_2", {}, 100, 0)
+        self.assertEqual(app.knowledge_generation(), generation + 1)
+        self.assertEqual(len(app.hybrid_search("cache warm", top_k=3)), 2)
+
+    def test_lru_ttl_cache_evicts_and_expires(self):
+        cache = app.LRUTTLCache("unit", maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+        cache.set("e", 5, ttl=0.001)
+        app.time.sleep(0.01)
+        self.assertIsNone(cache.get("e"))
+
+    def test_memory_store_grows_and_ranks_top_k(self):
+        store = app.MemoryKnowledgeStore(dim=app.EMBEDDING_DIM, initial_capacity=2)
+        texts = [f"topic {i} shared words" for i in range(9)] + ["vector databases and ivfflat indexes"]
+        records = [{"id": f"chunk_{i}", "content": text} for i, text in enumerate(texts)]
+        store.extend(records, [app.embed_text(text) for text in texts])
+        self.assertEqual(len(store), 10)
+        self.assertGreaterEqual(store.matrix.shape[0], 10)
+
+        results = store.search(app.embed_text("vector databases"), top_k=3)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["id"], "chunk_9")
+        scores = [item["score"] for item in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_memory_keyword_search_uses_bm25_postings(self):
+        store = app.MemoryKnowledgeStore(dim=app.EMBEDDING_DIM)
+        texts = [
+            "postgres tuning guide for connection pools",
+            "langgraph langgraph langgraph state machines",
+            "unrelated gardening notes",
+        ]
+        records = [{"id": f"chunk_{i}", "content": text} for i, text in enumerate(texts)]
+        store.extend(records, [app.embed_text(text) for text in texts])
+        self.assertEqual(store.postings["langgraph"], [(1, 3)])
+
+        results = store.keyword_search("langgraph pools", top_k=5)
+        self.assertEqual([item["id"] for item in results], ["chunk_1", "chunk_0"])
+        self.assertGreater(results[0]["score"], 0.0)
+        self.assertEqual(store.keyword_search("nothing matches", top_k=5), [])
 
     def test_metrics_endpoint_contains_orchestrator_metrics(self):
         _ = app.run_graph(app.GraphRunRequest(prompt="Simple planning task"))
@@ -72,6 +1130,26 @@ class OrchestratorGraphTests(unittest.TestCase):
         self.assertIn("hephaestus_orchestrator_graph_runs_total", metrics_text)
         self.assertIn("hephaestus_orchestrator_node_duration_seconds", metrics_text)
         self.assertIn("hephaestus_orchestrator_tool_executions_total", metrics_text)
+        self.assertIn("hephaestus_orchestrator_db_pool_in_use", metrics_text)
+        self.assertIn("hephaestus_orchestrator_db_pool_waiting", metrics_text)
+
+    def test_db_pool_disabled_without_database_url(self):
+        self.assertIsNone(app.get_pool())
+        self.assertEqual(app.pool_stats(), {})
+        self.assertEqual(app.pool_in_use(), 0)
+
+    def test_write_behind_persister_batches_and_flushes_on_stop(self):
+        batches = []
+        persister = app.RunPersister(writer=batches.append, max_queue=10, batch_size=50, flush_interval=0.05)
+        result = app.run_graph(app.GraphRunRequest(prompt="Plan a release"))
+        state = {**result, "prompt": "Plan a release", "metadata": {}}
+        for _ in range(3):
+            self.assertTrue(persister.submit(app.run_record(state)))
+        persister.stop()
+        self.assertEqual(sum(len(batch) for batch in batches), 3)
+        run_row, step_rows = batches[0][0]
+        self.assertEqual(run_row[0], result["run_id"])
+        self.assertEqual(len(step_rows), len(result["steps"]))
 
 
 if __name__ == "__main__":